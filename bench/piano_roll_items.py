@@ -0,0 +1,85 @@
+# piano_roll_items.py
+#
+# Counts how many canvas items PianoRollCanvas creates per interaction.
+# Needs a display (use Xvfb on headless machines). Run from the repo root:
+#
+#   python bench/piano_roll_items.py               # current tree
+#   python bench/piano_roll_items.py --ref HEAD~1  # also a previous revision
+
+import argparse
+import os
+import subprocess
+import sys
+import tkinter as tk
+import types
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+class Event:
+    def __init__(self, x, y):
+        self.x = x
+        self.y = y
+
+
+def items_created(canvas, action):
+    # Canvas item ids increase monotonically, so a probe item before and
+    # after the action tells how many items were created in between
+    before = canvas.create_line(0, 0, 0, 0)
+    canvas.delete(before)
+    action()
+    after = canvas.create_line(0, 0, 0, 0)
+    canvas.delete(after)
+    return after - before - 1
+
+
+def run(canvas_cls, root):
+    canvas = canvas_cls(root, steps=64, cell_width=20, cell_height=20, sidebar_width=90)
+    canvas.pack(fill="both", expand=True)
+    root.update()
+    x0, cw, ch = canvas.sidebar_width, canvas.cell_width, canvas.cell_height
+    canvas.notes_list = [{'row': row, 'start': col, 'end': col + 3}
+                         for row in range(0, 12, 2) for col in range(0, 64, 8)]
+    canvas.draw_grid()
+    return [
+        ("add note", items_created(canvas, lambda: canvas.handle_left_click(Event(x0 + 5 * cw + 2, 1 * ch + 2)))),
+        ("drag motion", items_created(canvas, lambda: canvas.handle_drag_motion(Event(x0 + 7 * cw + 2, 1 * ch + 2)))),
+        ("scroll", items_created(canvas, lambda: canvas.scroll_vertical(3))),
+        ("playhead step", items_created(canvas, lambda: canvas.set_playhead(12))),
+        ("highlight column", items_created(canvas, lambda: canvas.highlight_column(12))),
+        ("delete note", items_created(canvas, lambda: canvas.handle_right_click(Event(x0 + 2, 3 * ch + 2)))),
+        ("full redraw", items_created(canvas, canvas.draw_grid)),
+    ]
+
+
+def load_revision(rev):
+    source = subprocess.check_output(["git", "show", f"{rev}:try3/piano_roll.py"], cwd=ROOT)
+    module = types.ModuleType(f"piano_roll_{rev}")
+    exec(compile(source, f"{rev}:try3/piano_roll.py", "exec"), module.__dict__)
+    return module.PianoRollCanvas
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Count canvas items created per piano-roll interaction")
+    parser.add_argument("--ref", help="git revision to compare against")
+    args = parser.parse_args()
+
+    sys.path.insert(0, os.path.join(ROOT, "try3"))
+    from piano_roll import PianoRollCanvas
+
+    root = tk.Tk()
+    root.geometry("1500x500")
+    columns = [("current", run(PianoRollCanvas, root))]
+    if args.ref:
+        for child in root.winfo_children():
+            child.destroy()
+        columns.insert(0, (args.ref, run(load_revision(args.ref), root)))
+    root.destroy()
+
+    print(f"{'items created':<20}" + "".join(f"{name:>12}" for name, _ in columns))
+    for i, (label, _) in enumerate(columns[0][1]):
+        print(f"{label:<20}" + "".join(f"{counts[i][1]:>12}" for _, counts in columns))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,301 @@
+# suite.py
+#
+# Benchmarks for the render, tick and redraw hot paths. Every run generates
+# its own synthetic samples in a temporary directory, so results don't
+# depend on what is in sounds/. Run from the repo root:
+#
+#   python bench/suite.py                                # write bench_results.json
+#   python bench/suite.py --tracks 32 --steps 128 --bars 16
+#   python bench/suite.py --out new.json --baseline old.json   # flag regressions
+#
+# Peak memory comes from tracemalloc, which can't see process-pool workers,
+# so that pass renders every track in-process instead.
+#
+# The redraw benchmarks need a display. Without $DISPLAY the suite starts
+# Xvfb if it is installed, otherwise those cases are reported as skipped.
+
+import argparse
+import contextlib
+import json
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+import types
+import wave
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+RATES = (44100, 48000, 22050)
+METRICS = ("seconds", "peak_bytes")
+
+
+def write_samples(sounds_dir, count):
+    """Decaying noise bursts of mixed rates, channel counts and lengths."""
+    import numpy as np
+    rng = np.random.default_rng(0)
+    folder = os.path.join(sounds_dir, "bench")
+    os.makedirs(folder, exist_ok=True)
+    names = []
+    for i in range(count):
+        rate, channels = RATES[i % len(RATES)], 1 + i % 2
+        frames = int(rate * (0.1 + 0.4 * (i % 5)))
+        env = np.exp(-np.arange(frames) / (rate * 0.08))[:, None]
+        data = rng.uniform(-0.8, 0.8, (frames, channels)) * env
+        name = f"s{i:03d}.wav"
+        with wave.open(os.path.join(folder, name), "wb") as wav:
+            wav.setnchannels(channels)
+            wav.setsampwidth(2)
+            wav.setframerate(rate)
+            wav.writeframes((data * 32767).astype("<i2").tobytes())
+        names.append(name)
+    return names
+
+
+def grids(tracks, steps, density=0.3, seed=1):
+    import numpy as np
+    from core.pattern import Pattern
+    rng = np.random.default_rng(seed)
+    return [Pattern.from_list((rng.random(steps) < density).tolist()) for _ in range(tracks)]
+
+
+@contextlib.contextmanager
+def inline_renders():
+    """Render export tracks in this process, where tracemalloc can see them."""
+    from core import stems
+    saved = stems.PARALLEL_MIN_RENDERS
+    stems.PARALLEL_MIN_RENDERS = float("inf")
+    try:
+        yield
+    finally:
+        stems.PARALLEL_MIN_RENDERS = saved
+
+
+def measure(fn, repeat, setup=None, calls=1):
+    """Median/min seconds per call over `repeat` runs, plus one traced run for peak memory."""
+    times = []
+    for _ in range(repeat):
+        if setup:
+            setup()
+        start = time.perf_counter()
+        for _ in range(calls):
+            fn()
+        times.append((time.perf_counter() - start) / calls)
+    if setup:
+        setup()
+    with inline_renders():
+        tracemalloc.start()
+        fn()
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+    return {"seconds": statistics.median(times), "min": min(times), "runs": repeat, "peak_bytes": peak}
+
+
+def bench_project(args, names, seed=1):
+    from core.model import Project, Track
+    project = Project(120, args.steps)
+    for i, grid in enumerate(grids(args.tracks, args.steps, seed=seed)):
+        project.add_track(Track("bench", names[i % len(names)], args.steps, grid=grid))
+    return project
+
+
+def bench_export(args, names, results):
+    import sequencer
+    from project import playback
+    from core.stems import track_renders
+
+    project = bench_project(args, names)
+    app = types.SimpleNamespace(project=project, read_bpm=lambda: True)
+    export = lambda: sequencer.SequencerApp.export_sequence(app, "bench.wav", args.bars)
+    results["export_sequence.cold"] = measure(export, args.repeat, setup=track_renders.clear)
+
+    def touch_one_cell():
+        track_renders.clear()
+        export()
+        project.tracks[0].grid = project.tracks[0].grid.copy()
+        project.tracks[0].grid.toggle([0])
+    results["export_sequence.one_cell_changed"] = measure(export, args.repeat, setup=touch_one_cell)
+
+    playback.STEPS, playback.REPEATS = args.steps, args.bars
+    selected = [types.SimpleNamespace(get=lambda name=track.sample: name) for track in project.tracks]
+    tracks = [{"folder": "bench"} for _ in project.tracks]
+    play = lambda: playback.play_sequence([track.grid for track in project.tracks], selected, 120, tracks)
+    results["project.play_sequence"] = measure(play, args.repeat, setup=track_renders.clear)
+
+    # A five-minute song cycling through six patterns, two sections at a time
+    from core.engine import export_song
+    from core.mixer import loop_frames
+    from core.model import Song
+    patterns = [bench_project(args, names, seed) for seed in range(1, 7)]
+    song = Song(120)
+    sections = -(-300 * 1000 // (loop_frames(120, args.steps, 1000) * 2))
+    for i in range(sections):
+        song.add_section(patterns[i // 2 % len(patterns)], 2)
+    snapshot = song.snapshot()
+    results["export_song.cold"] = measure(lambda: export_song(snapshot, "song.wav"), args.repeat,
+                                          setup=track_renders.clear)
+
+
+def bench_tick(args, names, results):
+    import sequencer
+    from core.engine import Player
+    from core.sinks import AudioSink
+
+    player = Player("sounds", sink_factory=lambda: AudioSink(
+        44100, 2, max_voices=sequencer.MAX_VOICES, track_voices=sequencer.TRACK_VOICES,
+        steal=sequencer.STEAL_POLICY))
+    scheduler = player.prepare(bench_project(args, names).snapshot())
+    events = player.events_for_step
+    col = iter(range(10 ** 9))
+    results["step.events_for_step"] = measure(lambda: events(next(col) % args.steps), args.repeat,
+                                              calls=args.steps)
+
+    def tick():
+        # One step: schedule its hits and mix up to the next one
+        scheduler.advance(scheduler.step_frame(scheduler.next_step + 1))
+    results["step.scheduler_tick"] = measure(tick, args.repeat, calls=args.steps)
+
+
+def bench_draw(args, names, results):
+    import tkinter as tk
+    import sequencer
+    from core.model import Note
+    from piano_roll import PianoRollCanvas
+
+    root = tk.Tk()
+    root.geometry("1600x700")
+    try:
+        canvas = PianoRollCanvas(root, steps=args.steps, cell_width=20, cell_height=20, sidebar_width=90)
+        canvas.pack(fill="both", expand=True)
+        canvas.notes_list = [Note(row, col, col + 3) for row in range(0, 24, 2) for col in range(0, args.steps, 8)]
+        root.update()
+        results["draw.piano_roll"] = measure(canvas.draw_grid, args.repeat, calls=10)
+
+        frame = tk.Frame(root)
+        frame.pack()
+        rows = [sequencer.TrackRow(frame, i, lambda row: None, lambda row: None, steps=args.steps)
+                for i in range(args.tracks)]
+        for row, grid in zip(rows, grids(args.tracks, args.steps)):
+            row.grid = grid
+        root.update()
+        results["draw.track_rows"] = measure(lambda: [row.draw_grid() for row in rows], args.repeat, calls=10)
+    finally:
+        root.destroy()
+
+
+def ensure_display():
+    if os.environ.get("DISPLAY"):
+        return None, None
+    xvfb = shutil.which("Xvfb")
+    if not xvfb:
+        return None, "no display and Xvfb is not installed"
+    display = ":97"
+    proc = subprocess.Popen([xvfb, display, "-screen", "0", "1920x1080x24"],
+                            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    time.sleep(0.5)
+    os.environ["DISPLAY"] = display
+    return proc, None
+
+
+def compare(results, baseline, tolerance):
+    """Print new vs baseline per metric; returns the regressed (case, metric) pairs."""
+    regressions = []
+    print(f"{'case':<36}{'metric':>12}{'baseline':>14}{'current':>14}{'ratio':>8}")
+    for case, new in sorted(results.items()):
+        old = baseline.get(case)
+        if not old or "skipped" in new or "skipped" in old:
+            continue
+        for metric in METRICS:
+            if not old.get(metric) or metric not in new:
+                continue
+            ratio = new[metric] / old[metric]
+            flag = " REGRESSION" if ratio > 1 + tolerance else ""
+            if flag:
+                regressions.append((case, metric))
+            print(f"{case:<36}{metric:>12}{old[metric]:>14.6g}{new[metric]:>14.6g}{ratio:>8.2f}{flag}")
+    return regressions
+
+
+def git_revision():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT,
+                                       stderr=subprocess.DEVNULL).decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark export, step and redraw hot paths")
+    parser.add_argument("--tracks", type=int, default=16)
+    parser.add_argument("--steps", type=int, default=64)
+    parser.add_argument("--bars", type=int, default=8)
+    parser.add_argument("--repeat", type=int, default=5, help="timed runs per case (default: 5)")
+    parser.add_argument("--only", default="export,tick,draw", help="comma-separated groups to run")
+    parser.add_argument("--out", default="bench_results.json")
+    parser.add_argument("--baseline", help="earlier results to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.15,
+                        help="allowed slowdown/growth before flagging a regression (default: 0.15)")
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="one-bench-")
+    # Keep the converted-sample disk cache and pygame's audio out of the way
+    os.environ["XDG_CACHE_HOME"] = os.path.join(workdir, "cache")
+    os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+    sys.path.insert(0, os.path.join(ROOT, "try3"))
+    sys.path.insert(0, ROOT)
+    cwd = os.getcwd()
+    xvfb = None
+    results = {}
+    try:
+        os.chdir(workdir)
+        names = write_samples("sounds", args.tracks)
+        groups = {"export": bench_export, "tick": bench_tick, "draw": bench_draw}
+        for group in args.only.split(","):
+            if group == "draw":
+                xvfb, reason = ensure_display()
+                if reason:
+                    results["draw.piano_roll"] = results["draw.track_rows"] = {"skipped": reason}
+                    continue
+            # The export paths log every track; keep that out of the report
+            with open(os.devnull, "w") as null, contextlib.redirect_stdout(null):
+                groups[group](args, names, results)
+    finally:
+        os.chdir(cwd)
+        if xvfb:
+            xvfb.terminate()
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    report = {
+        "meta": {"revision": git_revision(), "python": platform.python_version(),
+                 "platform": platform.platform(), "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+                 "tracks": args.tracks, "steps": args.steps, "bars": args.bars, "repeat": args.repeat},
+        "results": results,
+    }
+    with open(args.out, "w") as f:
+        json.dump(report, f, indent=2, sort_keys=True)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        if baseline.get("meta", {}).get("tracks") != args.tracks or \
+                baseline.get("meta", {}).get("steps") != args.steps or \
+                baseline.get("meta", {}).get("bars") != args.bars:
+            print("warning: baseline was run with different --tracks/--steps/--bars")
+        regressions = compare(results, baseline.get("results", {}), args.tolerance)
+        print(f"{len(regressions)} regression(s) beyond {args.tolerance:.0%}")
+        return 1 if regressions else 0
+    for case, result in sorted(results.items()):
+        if "skipped" in result:
+            print(f"{case:<36}skipped: {result['skipped']}")
+        else:
+            print(f"{case:<36}{result['seconds'] * 1000:>10.3f} ms{result['peak_bytes'] / 1024:>12.0f} KiB peak")
+    print(f"Wrote {args.out}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
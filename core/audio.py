@@ -0,0 +1,37 @@
+# audio.py
+#
+# Lazy start-up of the audio backend. Nothing here imports pygame or pydub
+# at module import: the mixer is opened the first time Play needs it, so
+# opening a front end just to edit patterns neither waits for the backend
+# nor grabs the audio device.
+# preload_async() imports both modules on a background thread once the
+# window is up, without opening the device, so that first Play is quick too.
+
+import threading
+
+MIXER_FORMAT = (44100, -16, 2)  # frequency, size, channels
+
+_lock = threading.Lock()
+
+
+def ensure_mixer(frequency=MIXER_FORMAT[0], size=MIXER_FORMAT[1], channels=MIXER_FORMAT[2]):
+    """Open pygame.mixer if nobody has yet; returns its (frequency, size, channels)."""
+    with _lock:
+        import pygame
+        if not pygame.mixer.get_init():
+            pygame.mixer.init(frequency=frequency, size=size, channels=channels)
+        return pygame.mixer.get_init()
+
+
+def _preload():
+    import pygame  # noqa: F401
+    try:
+        import pydub  # noqa: F401  (looks for ffmpeg on import)
+    except ImportError:
+        pass
+
+
+def preload_async():
+    thread = threading.Thread(target=_preload, name="audio-preload", daemon=True)
+    thread.start()
+    return thread
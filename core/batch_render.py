@@ -0,0 +1,240 @@
+# batch_render.py
+#
+# Headless batch renderer for pattern files, no Tk involved:
+#
+#   python -m core.batch_render patterns/*.json [--out zoutputs] [--workers 8]
+#
+# A pattern file is JSON:
+#
+#   {"bpm": 120, "bars": 4, "steps": 64, "output": "beat.wav",
+#    "tracks": [
+#      {"folder": "kicks", "sample": "basicKick.wav", "grid": "x---x---..."},
+#      {"folder": "synth", "notes": [{"row": 48, "start": 0, "end": 3}], "mute": false}]}
+#
+# "grid" is a list of 0/1 or a string where anything but "-", "." or "0" is a
+# hit. Tracks with "notes" are piano-roll tracks.
+#
+# A song file arranges patterns instead of listing tracks. Each section is a
+# pattern file (relative to the song) or an inline pattern, played "repeats"
+# times at the song's bpm; each distinct pattern is rendered only once:
+#
+#   {"bpm": 128, "output": "song.wav",
+#    "song": [{"pattern": "intro.json", "repeats": 2},
+#             {"pattern": "verse.json", "repeats": 8}, {"pattern": "intro.json"}]}
+#
+# Files whose inputs, samples and output are unchanged since the last run
+# are skipped. A JSON summary goes to stdout; the exit code is 0 if
+# everything rendered or was skipped, 1 if any file failed and 2 on bad
+# arguments.
+
+import argparse
+import contextlib
+import hashlib
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from .mixer import export_loop
+from .note_voices import note_tracks, synth_sample_path
+from .pattern import Pattern
+from .stems import export_sections
+
+RENDER_VERSION = 2  # bump to invalidate every manifest entry
+MANIFEST_NAME = ".batch_render.json"
+DEFAULT_BPM = 120
+DEFAULT_BARS = 4
+DEFAULT_STEPS = 64
+
+
+def parse_grid(grid, steps):
+    if isinstance(grid, str):
+        cells = [0 if c in "-.0" else 1 for c in grid]
+    else:
+        cells = [1 if c else 0 for c in grid]
+    return Pattern.from_list((cells + [0] * steps)[:steps])
+
+
+def load_pattern(path):
+    with open(path) as f:
+        return check_pattern(json.load(f))
+
+
+def check_pattern(pattern):
+    pattern.setdefault("bpm", DEFAULT_BPM)
+    pattern.setdefault("bars", DEFAULT_BARS)
+    pattern.setdefault("steps", DEFAULT_STEPS)
+    pattern.setdefault("tracks", [])
+    if int(pattern["bpm"]) <= 0 or int(pattern["bars"]) <= 0 or int(pattern["steps"]) <= 0:
+        raise ValueError("bpm, bars and steps must be positive")
+    return pattern
+
+
+def pattern_tracks(pattern, sounds_dir):
+    """Mixer tracks for a pattern; muted tracks are left out."""
+    bpm, steps = int(pattern["bpm"]), int(pattern["steps"])
+    tracks = []
+    for track in pattern["tracks"]:
+        if track.get("mute"):
+            continue
+        folder = track.get("folder", "")
+        if "notes" in track:
+            tracks.extend(note_tracks(
+                folder, track["notes"], bpm, steps,
+                lambda midi_num, folder: synth_sample_path(midi_num, folder, sounds_dir)))
+        else:
+            path = os.path.join(sounds_dir, folder, track["sample"])
+            tracks.append((path, parse_grid(track.get("grid", []), steps)))
+    return tracks
+
+
+def song_patterns(song, song_path):
+    """(pattern, repeats) for every section of a song, each at the song's bpm."""
+    sections = []
+    for section in song["song"]:
+        pattern = section["pattern"]
+        if isinstance(pattern, str):
+            pattern = load_pattern(os.path.join(os.path.dirname(song_path), pattern))
+        else:
+            pattern = check_pattern(dict(pattern))
+        repeats = int(section.get("repeats", 1))
+        if repeats < 0:
+            raise ValueError("repeats can't be negative")
+        sections.append((dict(pattern, bpm=song["bpm"]), repeats))
+    return sections
+
+
+def output_path_for(pattern_path, pattern, out_dir):
+    name = pattern.get("output") or os.path.splitext(os.path.basename(pattern_path))[0] + ".wav"
+    return os.path.join(out_dir, name)
+
+
+def input_hash(pattern, tracks):
+    h = hashlib.sha1()
+    h.update(json.dumps([RENDER_VERSION, pattern], sort_keys=True).encode())
+    for path in sorted({track[0] for track in tracks}):
+        try:
+            st = os.stat(path)
+            h.update(f"{path}:{st.st_mtime_ns}:{st.st_size}".encode())
+        except OSError:
+            h.update(f"{path}:missing".encode())
+    return h.hexdigest()
+
+
+def render_pattern(output_path, tracks, bpm, bars, steps):
+    """Worker: render one pattern, returning the seconds it took."""
+    start = time.perf_counter()
+    # stdout carries the JSON summary, keep the mixer's messages off it
+    with contextlib.redirect_stdout(sys.stderr):
+        export_loop(tracks, bpm, bars, output_path, steps)
+    return time.perf_counter() - start
+
+
+def render_song(output_path, sections, bpm, workers=None):
+    """Render a song, (tracks, steps, repeats) sections, returning the seconds it took.
+
+    Runs in this process: export_sections spreads the tracks over a pool itself.
+    """
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(sys.stderr):
+        export_sections(sections, bpm, output_path, workers)
+    return time.perf_counter() - start
+
+
+def load_manifest(out_dir):
+    try:
+        with open(os.path.join(out_dir, MANIFEST_NAME)) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def save_manifest(out_dir, manifest):
+    path = os.path.join(out_dir, MANIFEST_NAME)
+    with open(path + ".tmp", "w") as f:
+        json.dump(manifest, f, indent=1, sort_keys=True)
+    os.replace(path + ".tmp", path)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m core.batch_render",
+                                     description="Render pattern and song files to WAV without the GUI.")
+    parser.add_argument("patterns", nargs="+", help="pattern or song JSON files")
+    parser.add_argument("--out", default="zoutputs", help="output directory (default: zoutputs)")
+    parser.add_argument("--sounds", default="sounds", help="sample library root (default: sounds)")
+    parser.add_argument("--workers", type=int, default=None, help="worker processes (default: CPU count)")
+    parser.add_argument("--force", action="store_true", help="render even if inputs are unchanged")
+    args = parser.parse_args(argv)
+
+    started = time.perf_counter()
+    os.makedirs(args.out, exist_ok=True)
+    manifest = load_manifest(args.out)
+    results = []
+    jobs = []
+    songs = []
+    for pattern_path in args.patterns:
+        entry = {"pattern": pattern_path}
+        results.append(entry)
+        try:
+            pattern = load_pattern(pattern_path)
+            if "song" in pattern:
+                sections = song_patterns(pattern, pattern_path)
+                # Hashed with the patterns it plays, so editing one re-renders the song
+                pattern = dict(pattern, song=[{"pattern": p, "repeats": r} for p, r in sections])
+                sections = [(pattern_tracks(p, args.sounds), int(p["steps"]), r) for p, r in sections]
+                tracks = [track for section_tracks, _, _ in sections for track in section_tracks]
+            else:
+                sections = None
+                tracks = pattern_tracks(pattern, args.sounds)
+            missing = sorted({track[0] for track in tracks if not os.path.isfile(track[0])})
+            if missing:
+                raise FileNotFoundError(f"missing samples: {', '.join(missing)}")
+        except Exception as e:
+            entry.update(status="failed", error=str(e))
+            continue
+        output_path = output_path_for(pattern_path, pattern, args.out)
+        digest = input_hash(pattern, tracks)
+        entry["output"] = output_path
+        key = os.path.abspath(pattern_path)
+        if not args.force and manifest.get(key) == {"hash": digest, "output": output_path} \
+                and os.path.exists(output_path):
+            entry.update(status="skipped", seconds=0.0)
+            continue
+        if sections is not None:
+            songs.append((entry, key, digest, output_path, sections, int(pattern["bpm"])))
+            continue
+        jobs.append((entry, key, digest, output_path, tracks,
+                     int(pattern["bpm"]), int(pattern["bars"]), int(pattern["steps"])))
+
+    if jobs:
+        with ProcessPoolExecutor(max_workers=args.workers) as pool:
+            futures = [(entry, key, digest, output_path,
+                        pool.submit(render_pattern, output_path, tracks, bpm, bars, steps))
+                       for entry, key, digest, output_path, tracks, bpm, bars, steps in jobs]
+            for entry, key, digest, output_path, future in futures:
+                try:
+                    entry.update(status="rendered", seconds=round(future.result(), 4))
+                    manifest[key] = {"hash": digest, "output": output_path}
+                except Exception as e:
+                    entry.update(status="failed", error=str(e))
+                    manifest.pop(key, None)
+    for entry, key, digest, output_path, sections, bpm in songs:
+        try:
+            entry.update(status="rendered", seconds=round(render_song(output_path, sections, bpm, args.workers), 4))
+            manifest[key] = {"hash": digest, "output": output_path}
+        except Exception as e:
+            entry.update(status="failed", error=str(e))
+            manifest.pop(key, None)
+    if jobs or songs:
+        save_manifest(args.out, manifest)
+
+    counts = {status: sum(1 for r in results if r["status"] == status)
+              for status in ("rendered", "skipped", "failed")}
+    summary = dict(counts, seconds=round(time.perf_counter() - started, 4), patterns=results)
+    json.dump(summary, sys.stdout, indent=2)
+    sys.stdout.write("\n")
+    return 1 if counts["failed"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,156 @@
+# engine.py
+#
+# The one render/playback engine every front end binds to. Both entry points
+# take a ProjectSnapshot (see model.py): export_project renders it through
+# the cached parallel export, and Player plays it live on the lookahead
+# scheduler, swapping in a fresh snapshot whenever the UI edits something.
+# export_song renders a whole arrangement (a SongSnapshot) the same way.
+
+import os
+from .mixer import export_loop
+from .note_index import NoteStartIndex
+from .note_voices import NoteVoiceCache, note_midi, note_steps, synth_sample_path
+from .sample_cache import sample_cache
+from .scheduler import Scheduler
+from .sinks import PygameSink
+from .stems import export_parallel, export_sections, track_renders
+
+SOUNDS_DIR = "sounds"
+PARALLEL_EXPORT_TRACKS = 8  # render per track (cached, pooled) from this many mixer tracks up
+
+
+def track_sources(snapshot, sounds_dir=SOUNDS_DIR):
+    """(stem, mixer track) for every unmuted drum track of a snapshot.
+
+    Piano-roll tracks are left out of the mixdown, as they always have been.
+    A mixer track is (path, grid); stem is (track index, sample name).
+    """
+    for index, track in enumerate(snapshot.tracks):
+        if track.mute or track.piano_roll or not track.sample:
+            continue
+        path = os.path.join(sounds_dir, track.folder, track.sample)
+        yield (index, os.path.splitext(track.sample)[0]), (path, track.grid)
+
+
+def mix_tracks(snapshot, sounds_dir=SOUNDS_DIR):
+    """Mixer tracks, (path, grid), for the unmuted drum tracks of a snapshot."""
+    return [source for _, source in track_sources(snapshot, sounds_dir)]
+
+
+def export_project(snapshot, output_path, bars, sounds_dir=SOUNDS_DIR, stems=False, cache=track_renders):
+    """Render `bars` loops of a snapshot to `output_path`; returns the stem paths.
+
+    Small projects stream straight into the file; stems and bigger projects
+    go through the per-track export and its render cache, with stems
+    numbered by project track.
+    """
+    sources = list(track_sources(snapshot, sounds_dir))
+    tracks = [track for _, track in sources]
+    if not stems and len(tracks) < PARALLEL_EXPORT_TRACKS:
+        export_loop(tracks, snapshot.bpm, bars, output_path, snapshot.steps)
+        return []
+    return export_parallel(tracks, snapshot.bpm, bars, output_path, snapshot.steps, stems=stems, cache=cache,
+                           stem_keys=[stem for stem, _ in sources])
+
+
+def export_song(snapshot, output_path, sounds_dir=SOUNDS_DIR, cache=track_renders):
+    """Render a SongSnapshot to `output_path`, each distinct pattern only once."""
+    sections = [(mix_tracks(pattern, sounds_dir), pattern.steps, repeats)
+                for pattern, repeats in snapshot.sections if repeats > 0]
+    export_sections(sections, snapshot.bpm, output_path, cache=cache)
+
+
+class Player:
+    """Live playback of a ProjectSnapshot.
+
+    sink_factory() makes the audio sink for each run (PygameSink by default,
+    with voice_limits passed through to its BlockMixer). Tempo is taken from
+    the snapshot given to start(); update() swaps in everything else while
+    playing, restarting from step 0 if the pattern length changed.
+    """
+
+    def __init__(self, sounds_dir=SOUNDS_DIR, sink_factory=None, **voice_limits):
+        self.sounds_dir = sounds_dir
+        self.sink_factory = sink_factory or (lambda: PygameSink(**voice_limits))
+        self.sink = None
+        self.scheduler = None
+        self.bpm = None
+        self.note_voices = None
+        self._plan = ()
+
+    @property
+    def playing(self):
+        return self.scheduler is not None
+
+    def start(self, snapshot):
+        if self.playing:
+            return
+        self.scheduler = self.prepare(snapshot)
+        self.scheduler.start()
+
+    def prepare(self, snapshot):
+        """Open a sink and resolve `snapshot`; returns the Scheduler, not yet started."""
+        self.sink = self.sink_factory()
+        if self.note_voices is None or (self.note_voices.frame_rate, self.note_voices.channels) != \
+                (self.sink.frame_rate, self.sink.channels):
+            self.note_voices = NoteVoiceCache(
+                lambda midi_num, folder: synth_sample_path(midi_num, folder, self.sounds_dir),
+                self.sink.frame_rate, self.sink.channels)
+        self.bpm = snapshot.bpm
+        self.note_voices.drop_other_tempos(self.bpm)
+        self._plan = self._prepare(snapshot)
+        return Scheduler(self.sink, snapshot.bpm, snapshot.steps, self.events_for_step)
+
+    def update(self, snapshot):
+        """Play `snapshot` from the next step on."""
+        if not self.playing:
+            return
+        if snapshot.steps != self.scheduler.steps:
+            # A new pattern length means a new step clock; start over
+            self.stop()
+            self.start(snapshot)
+            return
+        self._plan = self._prepare(snapshot)
+
+    def stop(self):
+        if self.playing:
+            self.scheduler.stop()
+            self.scheduler = None
+
+    def current_column(self):
+        return self.scheduler.current_column() if self.playing else None
+
+    def _prepare(self, snapshot):
+        # Everything the audio thread needs, resolved up front on this thread
+        plan = []
+        for track in snapshot.tracks:
+            if track.piano_roll:
+                index = NoteStartIndex(track.notes)
+                if not track.mute:
+                    self.note_voices.warm(track.folder, track.notes, self.bpm)
+                plan.append((track, index, None))
+                continue
+            data = None
+            if track.sample:
+                path = os.path.join(self.sounds_dir, track.folder, track.sample)
+                try:
+                    data = sample_cache.get_sample(path).frames_for(self.sink.frame_rate, self.sink.channels)
+                except Exception as e:
+                    print(f"Failed to load sound: {path}. Error: {e}")
+            plan.append((track, None, data))
+        return tuple(plan)
+
+    def events_for_step(self, col):
+        # Runs on the scheduler thread and only reads the current plan
+        events = []
+        for key, (track, index, data) in enumerate(self._plan):
+            if track.mute:
+                continue
+            if index is not None:
+                for note in index.at(col):
+                    voice = self.note_voices.get(track.folder, note_midi(note), note_steps(note), self.bpm)
+                    if voice is not None:
+                        events.append((voice, key))
+            elif data is not None and track.grid[col]:
+                events.append((data, key))
+        return events
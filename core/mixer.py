@@ -0,0 +1,164 @@
+# mixer.py
+#
+# Offline mixing engine shared by every export path. Each sample is decoded
+# once into a float32 array and every hit is added into one preallocated
+# output buffer, instead of copying the whole loop with AudioSegment.overlay
+# for every active step.
+
+import os
+import wave
+import numpy as np
+from .pattern import active_steps
+from .profiling import profiler
+from .sample import to_float, to_pcm
+from .sample_cache import sample_cache
+from .sinks import WavSink
+
+# AudioSegment.silent() defaults, which the old overlay loop started from.
+# The output format is the "widest" of these and every loaded sample, the
+# same way pydub syncs two segments before overlaying them.
+BASE_FRAME_RATE = 11025
+BASE_CHANNELS = 1
+BASE_SAMPLE_WIDTH = 2
+
+STREAM_BLOCK_FRAMES = 16384
+
+
+def step_ms(bpm):
+    return 60000 / bpm / 2
+
+
+def ms_to_frames(ms, frame_rate):
+    return int(ms * (frame_rate / 1000.0))
+
+
+def loop_frames(bpm, steps, frame_rate):
+    return ms_to_frames(int(step_ms(bpm) * steps), frame_rate)
+
+
+def step_offsets(grid, bpm, steps, frame_rate):
+    # Same arithmetic as ms_to_frames(int(col * step_ms)), over active hits only
+    cols = active_steps(grid, steps)
+    ms = (cols * step_ms(bpm)).astype(np.int64)
+    return (ms * (frame_rate / 1000.0)).astype(np.int64).tolist()
+
+
+def mix_into(out, data, offsets):
+    """Add `data` into `out` at every frame offset, cutting tails at the end of `out`."""
+    length = len(out)
+    data = to_float(data)
+    for offset in offsets:
+        if offset >= length:
+            continue
+        n = min(len(data), length - offset)
+        out[offset:offset + n] += data[:n]
+
+
+def output_format(samples):
+    frame_rate = max([BASE_FRAME_RATE] + [s.frame_rate for s in samples])
+    channels = max([BASE_CHANNELS] + [s.channels for s in samples])
+    sample_width = max([BASE_SAMPLE_WIDTH] + [s.sample_width for s in samples])
+    return frame_rate, channels, sample_width
+
+
+def load_tracks(tracks):
+    """Decode tracks, skipping samples that fail to load.
+
+    A track is (sample_path, grid) or (sample_path, grid, cut_ms), where
+    cut_ms limits how much of the sample each hit plays (piano-roll notes).
+    Returns (sample, grid, cut_ms) triples.
+    """
+    loaded = []
+    for track in tracks:
+        path, grid = track[0], track[1]
+        cut_ms = track[2] if len(track) > 2 else None
+        try:
+            loaded.append((sample_cache.get_sample(path), grid, cut_ms))
+        except Exception as e:
+            print(f"Error loading {path}: {e}")
+    return loaded
+
+
+def track_voice(sample, cut_ms, frame_rate, channels):
+    data = sample.frames_for(frame_rate, channels)
+    if cut_ms is not None:
+        data = data[:ms_to_frames(cut_ms, frame_rate)]
+    return data
+
+
+def render_loop(tracks, bpm, steps):
+    """Render one loop of `steps` steps.
+
+    tracks is a list of (sample_path, grid[, cut_ms]) tuples. Returns
+    (buffer, frame_rate, sample_width) with buffer a float32 (frames, channels)
+    array.
+    """
+    with profiler.timer("export.load"):
+        loaded = load_tracks(tracks)
+    frame_rate, channels, sample_width = output_format([s for s, _, _ in loaded])
+    out = np.zeros((loop_frames(bpm, steps, frame_rate), channels), dtype=np.float32)
+    with profiler.timer("export.mix"):
+        for sample, grid, cut_ms in loaded:
+            offsets = step_offsets(grid, bpm, steps, frame_rate)
+            if offsets:
+                mix_into(out, track_voice(sample, cut_ms, frame_rate, channels), offsets)
+    return out, frame_rate, sample_width
+
+
+def write_wav(path, buffer, frame_rate, sample_width):
+    with wave.open(path, "wb") as wav:
+        wav.setnchannels(buffer.shape[1])
+        wav.setsampwidth(sample_width)
+        wav.setframerate(frame_rate)
+        wav.writeframes(to_pcm(buffer, sample_width))
+
+
+def stream_loop(tracks, bpm, bars, output_path, steps, block_frames=STREAM_BLOCK_FRAMES):
+    """Render `bars` repeats of the loop block by block straight into a WAV file.
+
+    Only the samples and the voices sounding in the current block are held in
+    memory, so peak memory doesn't grow with the bar count. Tails that cross
+    the end of a loop carry on into the next one.
+    """
+    with profiler.timer("export.load"):
+        loaded = load_tracks(tracks)
+    frame_rate, channels, sample_width = output_format([s for s, _, _ in loaded])
+    length = loop_frames(bpm, steps, frame_rate)
+    hits = sorted(
+        ((offset, i) for i, (sample, grid, _) in enumerate(loaded)
+         for offset in step_offsets(grid, bpm, steps, frame_rate)),
+        key=lambda hit: hit[0])
+    voices = [track_voice(sample, cut_ms, frame_rate, channels) for sample, _, cut_ms in loaded]
+
+    total = length * bars
+    sink = WavSink(output_path, frame_rate, channels, block_frames, sample_width)
+    sink.open()
+    try:
+        next_hit = 0
+        with profiler.timer("export.mix_write"):
+            while sink.written < total:
+                block_end = min(sink.written + block_frames, total)
+                while hits and next_hit < len(hits) * bars:
+                    bar, i = divmod(next_hit, len(hits))
+                    offset, track = hits[i]
+                    frame = bar * length + offset
+                    if frame >= block_end:
+                        break
+                    sink.schedule(frame, voices[track], track)
+                    next_hit += 1
+                sink.render_until(block_end)
+    finally:
+        sink.close()
+    return output_path
+
+
+def export_loop(tracks, bpm, bars, output_path, steps, stream=True):
+    out_dir = os.path.dirname(output_path)
+    if out_dir:
+        os.makedirs(out_dir, exist_ok=True)
+    if stream:
+        return stream_loop(tracks, bpm, bars, output_path, steps)
+    loop, frame_rate, sample_width = render_loop(tracks, bpm, steps)
+    with profiler.timer("export.write"):
+        write_wav(output_path, np.tile(loop, (bars, 1)), frame_rate, sample_width)
+    return output_path
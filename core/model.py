@@ -0,0 +1,168 @@
+# model.py
+#
+# Tk-free sequencer state shared by every front end. The GUIs edit a
+# Project in place; the audio side only ever sees a ProjectSnapshot, an
+# immutable copy taken with Project.snapshot(), so the scheduler thread never
+# reads a Tk variable or a list the UI is halfway through changing.
+
+from collections import namedtuple
+from .pattern import Pattern
+from .project_file import load_project, save_project
+
+DEFAULT_STEPS = 64
+DEFAULT_BPM = 120
+
+TrackSnapshot = namedtuple("TrackSnapshot", ["piano_roll", "folder", "sample", "mute", "grid", "notes"])
+ProjectSnapshot = namedtuple("ProjectSnapshot", ["bpm", "steps", "tracks"])
+SongSnapshot = namedtuple("SongSnapshot", ["bpm", "sections"])  # sections: (ProjectSnapshot, repeats)
+
+
+class Note:
+    """A piano-roll note spanning steps start..end on row (0 = C8).
+
+    Item access (note['start']) works too, the way the note dicts in
+    batch pattern files and project dicts are read.
+    """
+
+    __slots__ = ("row", "start", "end")
+
+    def __init__(self, row, start, end):
+        self.row = row
+        self.start = start
+        self.end = end
+
+    def __getitem__(self, key):
+        if key not in self.__slots__:
+            raise KeyError(key)
+        return getattr(self, key)
+
+    def __setitem__(self, key, value):
+        if key not in self.__slots__:
+            raise KeyError(key)
+        setattr(self, key, value)
+
+    def __repr__(self):
+        return f"Note(row={self.row}, start={self.start}, end={self.end})"
+
+    def copy(self):
+        return Note(self.row, self.start, self.end)
+
+    def to_dict(self):
+        return {'row': self.row, 'start': self.start, 'end': self.end}
+
+    @classmethod
+    def from_dict(cls, note):
+        return cls(note['row'], note['start'], note['end'])
+
+
+class Track:
+    __slots__ = ("piano_roll", "folder", "sample", "mute", "grid", "notes")
+
+    def __init__(self, folder="", sample="", steps=DEFAULT_STEPS, piano_roll=False, mute=False,
+                 grid=None, notes=None):
+        self.piano_roll = piano_roll
+        self.folder = folder
+        self.sample = sample
+        self.mute = mute
+        self.grid = grid if grid is not None else Pattern(steps)
+        self.notes = notes if notes is not None else []
+
+    def snapshot(self):
+        return TrackSnapshot(self.piano_roll, self.folder, self.sample, self.mute,
+                             self.grid.copy(), tuple(note.copy() for note in self.notes))
+
+    def to_dict(self):
+        return {"piano_roll": self.piano_roll, "folder": self.folder,
+                "sample": "" if self.piano_roll else self.sample, "mute": self.mute,
+                "grid": self.grid, "notes": [note.to_dict() for note in self.notes]}
+
+    @classmethod
+    def from_dict(cls, track, steps=DEFAULT_STEPS):
+        grid = track.get("grid")
+        grid = grid.copy() if grid is not None else Pattern(steps)
+        if len(grid) != steps:
+            grid.resize(steps)
+        return cls(track.get("folder", ""), track.get("sample", ""), steps, bool(track.get("piano_roll")),
+                   bool(track.get("mute")), grid, [Note.from_dict(n) for n in track.get("notes", [])])
+
+
+class Project:
+    __slots__ = ("bpm", "steps", "tracks")
+
+    def __init__(self, bpm=DEFAULT_BPM, steps=DEFAULT_STEPS, tracks=None):
+        self.bpm = bpm
+        self.steps = steps
+        self.tracks = tracks if tracks is not None else []
+
+    def add_track(self, track=None):
+        track = track if track is not None else Track(steps=self.steps)
+        self.tracks.append(track)
+        return track
+
+    def remove_track(self, track):
+        # In place: front ends keep a reference to self.tracks
+        for i, t in enumerate(self.tracks):
+            if t is track:
+                del self.tracks[i]
+                return
+
+    def resize(self, steps):
+        """Change the pattern length, cropping steps and notes past the new end."""
+        self.steps = steps
+        for track in self.tracks:
+            track.grid.resize(steps)
+            notes = [note for note in track.notes if note.start < steps]
+            for note in notes:
+                note.end = min(note.end, steps - 1)
+            track.notes[:] = notes
+
+    def snapshot(self):
+        return ProjectSnapshot(self.bpm, self.steps, tuple(track.snapshot() for track in self.tracks))
+
+    def to_dict(self):
+        return {"bpm": self.bpm, "steps": self.steps, "tracks": [track.to_dict() for track in self.tracks]}
+
+    @classmethod
+    def from_dict(cls, project, steps=None):
+        steps = steps or project["steps"]
+        return cls(project["bpm"], steps, [Track.from_dict(t, steps) for t in project["tracks"]])
+
+    def save(self, path):
+        save_project(path, self.to_dict())
+
+    @classmethod
+    def load(cls, path, steps=None):
+        """Load a project file, optionally resizing every grid to `steps`."""
+        return cls.from_dict(load_project(path), steps)
+
+
+class Song:
+    """An arrangement: patterns (Projects) played one after another at one tempo.
+
+    sections lists [pattern, repeats] in play order. A pattern can appear in
+    any number of sections, and a variation is just an edited copy of one;
+    the pattern's own bpm is ignored in favour of the song's.
+    """
+
+    __slots__ = ("bpm", "sections")
+
+    def __init__(self, bpm=DEFAULT_BPM, sections=None):
+        self.bpm = bpm
+        self.sections = sections if sections is not None else []
+
+    def add_section(self, pattern, repeats=1):
+        self.sections.append([pattern, repeats])
+        return pattern
+
+    def bars(self):
+        return sum(repeats for _, repeats in self.sections)
+
+    def snapshot(self):
+        # One snapshot per pattern, however many sections play it
+        patterns = {}
+        sections = []
+        for pattern, repeats in self.sections:
+            if id(pattern) not in patterns:
+                patterns[id(pattern)] = pattern.snapshot()._replace(bpm=self.bpm)
+            sections.append((patterns[id(pattern)], repeats))
+        return SongSnapshot(self.bpm, tuple(sections))
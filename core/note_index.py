@@ -0,0 +1,113 @@
+# note_index.py
+#
+# Lookup structures for piano-roll notes ({'row', 'start', 'end'} dicts).
+
+import bisect
+
+
+class NoteStartIndex:
+    """Column -> notes starting on that column.
+
+    Built from a track snapshot's notes and never changed afterwards: the
+    Player makes a new one with every snapshot, so the scheduler thread
+    only ever reads it.
+    """
+
+    def __init__(self, notes=()):
+        self._by_start = {}
+        self.rebuild(notes)
+
+    def rebuild(self, notes):
+        by_start = {}
+        for note in notes:
+            by_start[note['start']] = by_start.get(note['start'], ()) + (note,)
+        self._by_start = by_start
+
+    def at(self, col):
+        return self._by_start.get(col, ())
+
+    def __len__(self):
+        return sum(len(bucket) for bucket in self._by_start.values())
+
+
+class NoteIntervalIndex:
+    """Per-pitch notes sorted by start, for O(log n) hit-testing.
+
+    Relies on the piano roll's rule that notes on one pitch never overlap:
+    sorted by start, their ends are sorted too, so the last note starting at
+    or before a column is the only one that can cover it.
+    """
+
+    def __init__(self, notes=()):
+        self._rows = {}  # pitch row -> ([starts], [notes]) kept in step
+        self.rebuild(notes)
+
+    def rebuild(self, notes):
+        self._rows = {}
+        for note in sorted(notes, key=lambda n: n['start']):
+            starts, row_notes = self._rows.setdefault(note['row'], ([], []))
+            starts.append(note['start'])
+            row_notes.append(note)
+
+    def add(self, note):
+        starts, row_notes = self._rows.setdefault(note['row'], ([], []))
+        i = bisect.bisect_right(starts, note['start'])
+        starts.insert(i, note['start'])
+        row_notes.insert(i, note)
+
+    def remove(self, note, start=None):
+        start = note['start'] if start is None else start
+        entry = self._rows.get(note['row'])
+        if entry is None:
+            return
+        starts, row_notes = entry
+        i = bisect.bisect_left(starts, start)
+        while i < len(starts) and starts[i] == start:
+            if row_notes[i] is note:
+                del starts[i]
+                del row_notes[i]
+                break
+            i += 1
+        if not starts:
+            del self._rows[note['row']]
+
+    def move(self, note, old_start):
+        if old_start == note['start']:
+            return
+        self.remove(note, old_start)
+        self.add(note)
+
+    def find(self, row, col):
+        entry = self._rows.get(row)
+        if entry is None:
+            return None
+        starts, row_notes = entry
+        i = bisect.bisect_right(starts, col) - 1
+        if i >= 0 and row_notes[i]['end'] >= col:
+            return row_notes[i]
+        return None
+
+    def overlaps(self, row, start, end, exclude=None):
+        entry = self._rows.get(row)
+        if entry is None:
+            return False
+        starts, row_notes = entry
+        i = bisect.bisect_right(starts, end) - 1
+        if i >= 0 and row_notes[i] is exclude:
+            i -= 1
+        return i >= 0 and row_notes[i]['end'] >= start
+
+    def in_range(self, row, start, end):
+        """Notes on `row` that sound anywhere in columns start..end, in order."""
+        entry = self._rows.get(row)
+        if entry is None:
+            return []
+        starts, row_notes = entry
+        # Only the last note starting before `start` can reach into the range
+        i = max(0, bisect.bisect_right(starts, start) - 1)
+        if i < len(row_notes) and row_notes[i]['end'] < start:
+            i += 1
+        return row_notes[i:bisect.bisect_right(starts, end)]
+
+    def has_row(self, row):
+        return row in self._rows
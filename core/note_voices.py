@@ -0,0 +1,87 @@
+# note_voices.py
+#
+# Pre-rendered pitched voices for Piano Roll playback. A voice is the note's
+# sample converted to the output format and cut to the note length (plus a
+# release buffer), so a note-on during playback is a dict lookup.
+
+import os
+from .mixer import ms_to_frames, step_ms
+from .sample_cache import sample_cache
+
+BUFFER_MS = 1000  # release tail kept after the note's last step
+
+
+def midi_to_note_name(midi_num):
+    names = ['c', 'c#', 'd', 'd#', 'e', 'f', 'f#', 'g', 'g#', 'a', 'a#', 'b']
+    note = names[midi_num % 12]
+    octave = midi_num // 12 - 1
+    return f"{note}{octave}".lower()
+
+
+def synth_sample_path(midi_num, synth_folder="synth", sounds_dir="sounds"):
+    note_name = midi_to_note_name(midi_num)
+    fname = f"{note_name}.wav"
+    return os.path.join(sounds_dir, synth_folder, fname)
+
+
+def note_midi(note):
+    return 108 - note['row']  # row 0 = C8
+
+
+def note_steps(note):
+    return note['end'] - note['start'] + 1
+
+
+def note_cut_ms(steps_long, bpm):
+    return int(steps_long * step_ms(bpm) + BUFFER_MS)
+
+
+def note_tracks(folder, notes, bpm, steps, sample_path_fn=synth_sample_path):
+    """Piano-roll notes as mixer tracks: one (path, grid, cut_ms) per pitch and length."""
+    grids = {}
+    for note in notes:
+        if 0 <= note['start'] < steps:
+            grid = grids.setdefault((note_midi(note), note_steps(note)), [0] * steps)
+            grid[note['start']] = 1
+    return [(sample_path_fn(midi_num, folder), grid, note_cut_ms(steps_long, bpm))
+            for (midi_num, steps_long), grid in sorted(grids.items())]
+
+
+class NoteVoiceCache:
+    def __init__(self, sample_path_fn, frame_rate=44100, channels=2):
+        # sample_path_fn(midi_num, folder) -> path of the sample for that pitch
+        self.sample_path_fn = sample_path_fn
+        self.frame_rate = frame_rate
+        self.channels = channels
+        self._voices = {}
+
+    def get(self, folder, midi_num, steps_long, bpm):
+        key = (folder, midi_num, steps_long, bpm)
+        try:
+            return self._voices[key]
+        except KeyError:
+            voice = self._voices[key] = self._render(*key)
+            return voice
+
+    def warm(self, folder, notes, bpm):
+        for note in notes:
+            self.get(folder, note_midi(note), note_steps(note), bpm)
+
+    def drop_other_tempos(self, bpm):
+        self._voices = {k: v for k, v in self._voices.items() if k[3] == bpm}
+
+    def clear(self):
+        self._voices.clear()
+
+    def _render(self, folder, midi_num, steps_long, bpm):
+        path = self.sample_path_fn(midi_num, folder)
+        try:
+            sample = sample_cache.get_sample(path)
+        except FileNotFoundError:
+            print(f"  File does not exist: {path}")
+            return None
+        except Exception as e:
+            print(f"  Couldn't load {path}: {e}")
+            return None
+        data = sample.frames_for(self.frame_rate, self.channels)
+        return data[:ms_to_frames(note_cut_ms(steps_long, bpm), self.frame_rate)]
@@ -0,0 +1,128 @@
+# pattern.py
+#
+# Step pattern stored as a NumPy bool array, with the sparse list of active
+# steps derived on demand. It behaves like the old list-of-ints grids
+# (len, grid[col], grid[col] = 1 - grid[col], iteration), so the front ends
+# keep working, while renderers ask for `events` and only visit actual hits.
+
+import numpy as np
+
+
+class Pattern:
+    __slots__ = ("_steps", "_events")
+
+    def __init__(self, steps=64):
+        self._steps = np.zeros(steps, dtype=bool)
+        self._events = None
+
+    @classmethod
+    def from_list(cls, cells):
+        pattern = cls(len(cells))
+        pattern._steps[:] = [bool(c) for c in cells]
+        return pattern
+
+    @classmethod
+    def from_events(cls, steps, events):
+        pattern = cls(steps)
+        pattern._steps[np.asarray(events, dtype=np.int64)] = True
+        return pattern
+
+    @classmethod
+    def from_bytes(cls, data, steps):
+        pattern = cls(steps)
+        pattern._steps[:] = np.unpackbits(np.frombuffer(data, dtype=np.uint8), count=steps).astype(bool)
+        return pattern
+
+    def to_bytes(self):
+        return np.packbits(self._steps).tobytes()
+
+    def tolist(self):
+        return self._steps.astype(np.int8).tolist()
+
+    def copy(self):
+        pattern = Pattern(0)
+        pattern._steps = self._steps.copy()
+        return pattern
+
+    def __len__(self):
+        return len(self._steps)
+
+    def __getitem__(self, col):
+        return int(self._steps[col])
+
+    def __setitem__(self, col, value):
+        self._steps[col] = bool(value)
+        self._events = None
+
+    def __iter__(self):
+        return iter(self.tolist())
+
+    def __eq__(self, other):
+        if not isinstance(other, Pattern):
+            return NotImplemented
+        return np.array_equal(self._steps, other._steps)
+
+    def __getstate__(self):
+        return len(self._steps), self.to_bytes()
+
+    def __setstate__(self, state):
+        steps, data = state
+        self._steps = Pattern.from_bytes(data, steps)._steps
+        self._events = None
+
+    @property
+    def events(self):
+        """Sorted array of active step indices (cached until the next edit)."""
+        if self._events is None:
+            self._events = np.flatnonzero(self._steps)
+        return self._events
+
+    def count(self):
+        return len(self.events)
+
+    # --- vectorized edits ---
+    def toggle(self, cols):
+        # Duplicate columns toggle once each, like repeated single clicks
+        cols = np.asarray(cols, dtype=np.int64).ravel()
+        flips = np.bincount(cols, minlength=len(self._steps)) % 2 == 1
+        self._steps ^= flips
+        self._events = None
+
+    def fill(self, start, stop, value=True, every=1):
+        self._steps[start:stop:every] = bool(value)
+        self._events = None
+
+    def clear(self):
+        self._steps[:] = False
+        self._events = None
+
+    def rotate(self, n):
+        """Rotate right by n steps; hits falling off the end wrap to the start."""
+        self._steps = np.roll(self._steps, n)
+        self._events = None
+
+    def shift(self, n):
+        """Shift right by n steps; hits falling off either end are dropped."""
+        steps = len(self._steps)
+        shifted = np.zeros_like(self._steps)
+        if 0 <= n < steps:
+            shifted[n:] = self._steps[:steps - n]
+        elif -steps < n < 0:
+            shifted[:n] = self._steps[-n:]
+        self._steps = shifted
+        self._events = None
+
+    def resize(self, steps):
+        resized = np.zeros(steps, dtype=bool)
+        n = min(steps, len(self._steps))
+        resized[:n] = self._steps[:n]
+        self._steps = resized
+        self._events = None
+
+
+def active_steps(grid, steps):
+    """Active columns below `steps` for a Pattern or a plain list grid."""
+    if isinstance(grid, Pattern):
+        events = grid.events
+        return events[:np.searchsorted(events, steps)]
+    return np.array([col for col in range(min(steps, len(grid))) if grid[col]], dtype=np.int64)
@@ -0,0 +1,151 @@
+# pcm_cache.py
+#
+# On-disk cache of samples already converted to the engine's output format.
+# Entries are keyed by a hash of the source file's contents plus the target
+# rate/channels, stored as .npy files and memory-mapped on load, so a sample
+# that needed resampling in one session loads at copy speed in the next.
+# The directory is kept under a size cap, least recently used first:
+#
+#   python -m core.pcm_cache stats
+#   python -m core.pcm_cache evict [--max-mb 256]
+#   python -m core.pcm_cache clear
+
+import argparse
+import hashlib
+import os
+import sys
+import threading
+import numpy as np
+
+CACHE_VERSION = 1  # bump whenever the conversion (resampler, mixdown) changes
+DEFAULT_DIR = os.path.join(
+    os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache"), "one", "pcm")
+DEFAULT_BUDGET = 1024 * 1024 * 1024
+DTYPES = ("float32", "int16")
+
+
+class PcmCache:
+    def __init__(self, directory=DEFAULT_DIR, budget=DEFAULT_BUDGET, dtype="float32"):
+        if dtype not in DTYPES:
+            raise ValueError(f"dtype must be one of {DTYPES}")
+        self.directory = directory
+        self.budget = budget
+        self.dtype = dtype
+        self.hits = 0
+        self.misses = 0
+        self._digests = {}  # abspath -> (mtime_ns, size, digest)
+        self._lock = threading.Lock()
+
+    def digest(self, path):
+        """Content hash of `path`, recomputed only when its mtime/size change."""
+        path = os.path.abspath(path)
+        st = os.stat(path)
+        with self._lock:
+            known = self._digests.get(path)
+        if known and known[:2] == (st.st_mtime_ns, st.st_size):
+            return known[2]
+        h = hashlib.sha1()
+        with open(path, "rb") as f:
+            for block in iter(lambda: f.read(1 << 20), b""):
+                h.update(block)
+        digest = h.hexdigest()
+        with self._lock:
+            self._digests[path] = (st.st_mtime_ns, st.st_size, digest)
+        return digest
+
+    def entry_path(self, path, frame_rate, channels):
+        name = f"{self.digest(path)}_{frame_rate}_{channels}_{self.dtype}_v{CACHE_VERSION}.npy"
+        return os.path.join(self.directory, name)
+
+    def load(self, path, frame_rate, channels):
+        """Cached (frames, channels) data for `path`, or None on a miss."""
+        try:
+            entry = self.entry_path(path, frame_rate, channels)
+            data = np.load(entry, mmap_mode="r")
+            os.utime(entry)  # mtime doubles as the LRU clock
+        except (OSError, ValueError):
+            self.misses += 1
+            return None
+        self.hits += 1
+        return data
+
+    def save(self, path, frame_rate, channels, data):
+        try:
+            entry = self.entry_path(path, frame_rate, channels)
+            os.makedirs(self.directory, exist_ok=True)
+            if self.dtype == "int16":
+                data = np.clip(np.round(data * 32768.0), -32768, 32767).astype(np.int16)
+            tmp = f"{entry}.{os.getpid()}.tmp"
+            with open(tmp, "wb") as f:
+                np.save(f, np.ascontiguousarray(data, dtype=self.dtype))
+            os.replace(tmp, entry)
+        except OSError as e:
+            print(f"Couldn't cache converted {path}: {e}")
+            return
+        self.trim()
+
+    def entries(self):
+        """(path, size, mtime) of every cache file, oldest first."""
+        try:
+            found = [(e.path, e.stat().st_size, e.stat().st_mtime)
+                     for e in os.scandir(self.directory) if e.name.endswith(".npy")]
+        except OSError:
+            return []
+        return sorted(found, key=lambda e: e[2])
+
+    def trim(self, budget=None):
+        """Delete least recently used entries until the cache fits `budget`."""
+        budget = self.budget if budget is None else budget
+        entries = self.entries()
+        total = sum(size for _, size, _ in entries)
+        removed = 0
+        for path, size, _ in entries:
+            if total <= budget:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            total -= size
+            removed += 1
+        return removed
+
+    def clear(self):
+        return self.trim(0)
+
+    def stats(self):
+        entries = self.entries()
+        return {
+            "directory": self.directory,
+            "entries": len(entries),
+            "bytes": sum(size for _, size, _ in entries),
+            "budget": self.budget,
+            "hits": self.hits,
+            "misses": self.misses,
+        }
+
+
+pcm_cache = PcmCache()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m core.pcm_cache",
+                                     description="Inspect or shrink the converted-sample cache.")
+    parser.add_argument("command", choices=["stats", "evict", "clear"])
+    parser.add_argument("--dir", default=DEFAULT_DIR, help=f"cache directory (default: {DEFAULT_DIR})")
+    parser.add_argument("--max-mb", type=float, default=DEFAULT_BUDGET / (1024 * 1024),
+                        help="size to evict down to, in MiB (default: %(default)d)")
+    args = parser.parse_args(argv)
+
+    cache = PcmCache(args.dir, int(args.max_mb * 1024 * 1024))
+    if args.command == "evict":
+        print(f"Removed {cache.trim()} entries")
+    elif args.command == "clear":
+        print(f"Removed {cache.clear()} entries")
+    stats = cache.stats()
+    print(f"{stats['entries']} entries, {stats['bytes'] / (1024 * 1024):.1f} MiB in {stats['directory']}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
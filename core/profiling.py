@@ -0,0 +1,152 @@
+# profiling.py
+#
+# Opt-in timing instrumentation for playback and export. Nothing is recorded
+# until the profiler is enabled (in the GUI, or with ONE_PROFILE=1 in the
+# environment); while disabled, timer() hands back a shared no-op context
+# and record() returns straight away.
+#
+# Every metric is a series of millisecond values. The profiler keeps
+# count/total/min/max and a fixed-bucket histogram per metric, plus the
+# most recent raw values for offline analysis. Metric names in use:
+#
+#   tick.lead_ms        how far ahead of the audio clock a step was scheduled
+#                       (negative = scheduled late, the step is heard late)
+#   tick.events         building and scheduling one step's voices
+#   tick.mix            mixing and writing audio blocks
+#   ui.playhead_late_ms how long after its audio time the playhead moved
+#   ui.highlight        redrawing the playhead column
+#   sample.decode       loading one sample file
+#   export.*            export stages (load, mix, render, write)
+
+import csv
+import json
+import os
+import threading
+import time
+from collections import deque
+
+# Upper bucket edges in ms; values above the last edge go in a final bucket
+BUCKET_EDGES_MS = (-20, -5, -1, 0, 1, 2, 5, 10, 25, 50, 75, 100, 150, 250, 500)
+RAW_HISTORY = 100000
+
+
+class _NullTimer:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NULL_TIMER = _NullTimer()
+
+
+class _Timer:
+    def __init__(self, profiler, name):
+        self.profiler = profiler
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.profiler.record(self.name, (time.perf_counter() - self.start) * 1000.0)
+        return False
+
+
+class Metric:
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.min = float("inf")
+        self.max = float("-inf")
+        self.buckets = [0] * (len(BUCKET_EDGES_MS) + 1)
+
+    def add(self, ms):
+        self.count += 1
+        self.total += ms
+        self.min = min(self.min, ms)
+        self.max = max(self.max, ms)
+        for i, edge in enumerate(BUCKET_EDGES_MS):
+            if ms <= edge:
+                self.buckets[i] += 1
+                return
+        self.buckets[-1] += 1
+
+    def summary(self):
+        return {
+            "count": self.count,
+            "total_ms": round(self.total, 3),
+            "mean_ms": round(self.total / self.count, 4) if self.count else None,
+            "min_ms": round(self.min, 4) if self.count else None,
+            "max_ms": round(self.max, 4) if self.count else None,
+            "histogram": self.buckets,
+        }
+
+
+class Profiler:
+    def __init__(self, enabled=False):
+        self.enabled = enabled
+        self.started = time.perf_counter()
+        self.metrics = {}
+        self.raw = deque(maxlen=RAW_HISTORY)  # (seconds since reset, name, ms)
+        self._lock = threading.Lock()
+
+    def timer(self, name):
+        return _Timer(self, name) if self.enabled else _NULL_TIMER
+
+    def record(self, name, ms):
+        if not self.enabled:
+            return
+        with self._lock:
+            metric = self.metrics.get(name)
+            if metric is None:
+                metric = self.metrics[name] = Metric()
+            metric.add(ms)
+            self.raw.append((time.perf_counter() - self.started, name, ms))
+
+    def reset(self):
+        with self._lock:
+            self.metrics = {}
+            self.raw.clear()
+            self.started = time.perf_counter()
+
+    def summary(self):
+        with self._lock:
+            return {name: metric.summary() for name, metric in sorted(self.metrics.items())}
+
+    def report(self):
+        """Plain-text summary for the overlay, one metric per line."""
+        summary = self.summary()
+        lines = [f"{'metric':<22}{'n':>7}{'mean':>9}{'max':>9}  ms"]
+        for name, s in summary.items():
+            lines.append(f"{name:<22}{s['count']:>7}{s['mean_ms']:>9.3f}{s['max_ms']:>9.3f}")
+        jitter = summary.get("tick.lead_ms")
+        if jitter:
+            lines.append("")
+            lines.append("step lead vs audio clock (ms)")
+            peak = max(jitter["histogram"]) or 1
+            labels = [f"<= {edge:g}" for edge in BUCKET_EDGES_MS] + [f">  {BUCKET_EDGES_MS[-1]:g}"]
+            for label, n in zip(labels, jitter["histogram"]):
+                if n:
+                    lines.append(f"{label:>8} {'#' * max(1, 30 * n // peak)} {n}")
+        return "\n".join(lines)
+
+    def dump(self, path_base):
+        """Write <path_base>.json (summary + histograms) and <path_base>.csv (raw values)."""
+        out_dir = os.path.dirname(path_base)
+        if out_dir:
+            os.makedirs(out_dir, exist_ok=True)
+        with self._lock:
+            raw = list(self.raw)
+        with open(path_base + ".json", "w") as f:
+            json.dump({"bucket_edges_ms": BUCKET_EDGES_MS, "metrics": self.summary()}, f, indent=2)
+        with open(path_base + ".csv", "w", newline="") as f:
+            writer = csv.writer(f)
+            writer.writerow(["time_s", "metric", "ms"])
+            writer.writerows((f"{t:.6f}", name, f"{ms:.4f}") for t, name, ms in raw)
+        return path_base + ".json", path_base + ".csv"
+
+
+profiler = Profiler(enabled=bool(os.environ.get("ONE_PROFILE")))
@@ -0,0 +1,116 @@
+# project_file.py
+#
+# Binary project files. Layout (little endian):
+#
+#   header   magic "ONEPRJ", u16 version, u16 bpm, u32 steps, u32 track count
+#   track    u8 kind (0 drum, 1 piano roll), u8 flags (bit 0 = muted),
+#            u16 folder length, u16 sample length, u32 note count,
+#            folder + sample (UTF-8), grid packed 8 steps per byte,
+#            notes as (u16 row, u32 start, u32 end) records
+#
+# Loading only parses this structure; samples are referenced by name and
+# decoded later (see SampleCache.prefetch), so a big project opens at once.
+
+import os
+import struct
+import numpy as np
+from .note_voices import note_midi, synth_sample_path
+from .pattern import Pattern
+
+MAGIC = b"ONEPRJ"
+VERSION = 1
+HEADER = struct.Struct("<6sHHII")
+TRACK = struct.Struct("<BBHHI")
+NOTE_DTYPE = np.dtype([("row", "<u2"), ("start", "<u4"), ("end", "<u4")])
+MAX_BPM = 0xFFFF  # stored as a u16
+
+DRUM, PIANO_ROLL = 0, 1
+FLAG_MUTED = 1
+
+
+class ProjectFileError(ValueError):
+    pass
+
+
+def save_project(path, project):
+    """Write a project dict: {"bpm", "steps", "tracks": [track dicts]}.
+
+    A track dict has "piano_roll" (bool), "folder", "sample", "mute",
+    "grid" (Pattern) and "notes" (list of note dicts).
+    """
+    if not 0 < project["bpm"] <= MAX_BPM:
+        raise ProjectFileError(f"{path}: BPM {project['bpm']} can't be saved (1-{MAX_BPM})")
+    steps = project["steps"]
+    chunks = [HEADER.pack(MAGIC, VERSION, project["bpm"], steps, len(project["tracks"]))]
+    for track in project["tracks"]:
+        folder = track.get("folder", "").encode("utf-8")
+        sample = track.get("sample", "").encode("utf-8")
+        notes = track.get("notes", [])
+        grid = track.get("grid")
+        if grid is None:
+            grid = Pattern(steps)
+        elif len(grid) != steps:
+            grid = grid.copy()
+            grid.resize(steps)
+        kind = PIANO_ROLL if track.get("piano_roll") else DRUM
+        flags = FLAG_MUTED if track.get("mute") else 0
+        chunks.append(TRACK.pack(kind, flags, len(folder), len(sample), len(notes)))
+        chunks.append(folder)
+        chunks.append(sample)
+        chunks.append(grid.to_bytes())
+        note_array = np.array([(n['row'], n['start'], n['end']) for n in notes], dtype=NOTE_DTYPE)
+        chunks.append(note_array.tobytes())
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(b"".join(chunks))
+    os.replace(tmp_path, path)
+
+
+def load_project(path):
+    with open(path, "rb") as f:
+        data = memoryview(f.read())
+    if len(data) < HEADER.size:
+        raise ProjectFileError(f"{path}: not a project file")
+    magic, version, bpm, steps, track_count = HEADER.unpack_from(data, 0)
+    if magic != MAGIC:
+        raise ProjectFileError(f"{path}: not a project file")
+    if version > VERSION:
+        raise ProjectFileError(f"{path}: project version {version} is newer than supported ({VERSION})")
+    grid_bytes = (steps + 7) // 8
+    pos = HEADER.size
+    tracks = []
+    try:
+        for _ in range(track_count):
+            kind, flags, folder_len, sample_len, note_count = TRACK.unpack_from(data, pos)
+            pos += TRACK.size
+            folder = bytes(data[pos:pos + folder_len]).decode("utf-8")
+            pos += folder_len
+            sample = bytes(data[pos:pos + sample_len]).decode("utf-8")
+            pos += sample_len
+            grid = Pattern.from_bytes(data[pos:pos + grid_bytes], steps)
+            pos += grid_bytes
+            notes = np.frombuffer(data, dtype=NOTE_DTYPE, count=note_count, offset=pos)
+            pos += note_count * NOTE_DTYPE.itemsize
+            tracks.append({
+                "piano_roll": kind == PIANO_ROLL,
+                "folder": folder,
+                "sample": sample,
+                "mute": bool(flags & FLAG_MUTED),
+                "grid": grid,
+                "notes": [{'row': r, 'start': s, 'end': e} for r, s, e in notes.tolist()],
+            })
+    except (struct.error, ValueError) as e:
+        raise ProjectFileError(f"{path}: truncated or corrupt project file ({e})")
+    return {"bpm": bpm, "steps": steps, "tracks": tracks}
+
+
+def project_sample_paths(project, sounds_dir="sounds"):
+    """Every sample file a project plays, in track order, without duplicates."""
+    paths = []
+    for track in project["tracks"]:
+        if track["piano_roll"]:
+            midis = sorted({note_midi(note) for note in track["notes"]})
+            paths.extend(synth_sample_path(m, track["folder"], sounds_dir) for m in midis)
+        elif track["sample"]:
+            paths.append(os.path.join(sounds_dir, track["folder"], track["sample"]))
+    return list(dict.fromkeys(paths))
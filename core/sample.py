@@ -0,0 +1,134 @@
+# sample.py
+#
+# Decoded PCM samples, plus the format conversions the mixer and the live
+# mixer objects need. Plain PCM WAVs are memory-mapped and kept as integer
+# views onto the file (see wavfile.py); everything else is decoded by pydub
+# into float32.
+
+import numpy as np
+from .wavfile import WavFormatError, map_wav
+
+_INT_TYPES = {1: np.int8, 2: np.int16, 4: np.int32}
+
+RESAMPLE_ZEROS = 16  # zero crossings on each side of the sinc kernel
+RESAMPLE_CHUNK = 4096  # output frames computed per vectorized pass
+
+
+class Sample:
+    def __init__(self, data, frame_rate, sample_width, mapped=False, path=None):
+        # shape (frames, channels): float32 with full scale = 1.0, or integer
+        # PCM read straight from a mapped file (mapped=True, see to_float)
+        self.data = data
+        self.frame_rate = frame_rate
+        self.sample_width = sample_width
+        self.mapped = mapped
+        self.path = path
+        self.store = None  # optional disk cache of conversions (PcmCache)
+        self._converted = {}
+
+    @property
+    def channels(self):
+        return self.data.shape[1]
+
+    @property
+    def nbytes(self):
+        # Mapped data (the WAV itself, or conversions loaded from the PCM cache)
+        # lives in the page cache rather than the heap, but it is charged all
+        # the same: every mapping also holds a file descriptor until dropped
+        return self.data.nbytes + sum(d.nbytes for d in self._converted.values())
+
+    def frames_for(self, frame_rate, channels):
+        """Sample data resampled/remixed to the given format (memoized).
+
+        The native format comes back as self.data, possibly integer PCM.
+        """
+        key = (frame_rate, channels)
+        if key == (self.frame_rate, self.channels):
+            return self.data
+        data = self._converted.get(key)
+        if data is None:
+            if self.store is not None and self.path:
+                data = self.store.load(self.path, frame_rate, channels)
+            if data is None:
+                data = set_channels(resample(to_float(self.data), self.frame_rate, frame_rate), channels)
+                if self.store is not None and self.path:
+                    self.store.save(self.path, frame_rate, channels, data)
+            self._converted[key] = data
+        return data
+
+
+def decode_sample(path):
+    try:
+        wav = map_wav(path)
+        return Sample(wav.pcm, wav.frame_rate, wav.sample_width, mapped=True, path=path)
+    except WavFormatError:
+        pass
+    from pydub import AudioSegment
+    seg = AudioSegment.from_file(path)
+    ints = np.frombuffer(seg.raw_data, dtype=_INT_TYPES[seg.sample_width])
+    data = ints.reshape(-1, seg.channels).astype(np.float32)
+    data /= float(1 << (8 * seg.sample_width - 1))
+    return Sample(data, seg.frame_rate, seg.sample_width, path=path)
+
+
+def to_float(pcm):
+    """float32 copy of PCM frames at full scale 1.0; float32 passes through."""
+    if pcm.dtype == np.float32:
+        return pcm
+    if pcm.dtype == np.uint8:
+        return (pcm.astype(np.float32) - 128.0) / 128.0
+    return pcm.astype(np.float32) / float(1 << (8 * pcm.dtype.itemsize - 1))
+
+
+def resample(data, src_rate, dst_rate):
+    """Band-limited resampling with a Hann-windowed sinc kernel.
+
+    When downsampling the kernel is widened so it also low-passes below the
+    new Nyquist frequency instead of folding the top octave back down.
+    """
+    if src_rate == dst_rate or len(data) == 0:
+        return data
+    data = to_float(data)
+    ratio = src_rate / dst_rate
+    cutoff = min(1.0, dst_rate / src_rate)
+    half = int(np.ceil(RESAMPLE_ZEROS / cutoff))  # kernel half-width in source frames
+    taps = np.arange(-half + 1, half + 1)
+    padded = np.concatenate([np.zeros((half, data.shape[1]), dtype=np.float32), data,
+                             np.zeros((half + 1, data.shape[1]), dtype=np.float32)])
+    n_out = int(len(data) * dst_rate / src_rate)
+    out = np.empty((n_out, data.shape[1]), dtype=np.float32)
+    for start in range(0, n_out, RESAMPLE_CHUNK):
+        t = np.arange(start, min(start + RESAMPLE_CHUNK, n_out)) * ratio
+        base = np.floor(t).astype(np.int64)
+        x = (t - base)[:, None] - taps  # distance from each tap to the output time
+        weights = np.sinc(cutoff * x) * (0.5 + 0.5 * np.cos(np.pi * x / half))
+        weights /= weights.sum(axis=1, keepdims=True)
+        frames = padded[base[:, None] + taps + half]
+        out[start:start + len(t)] = np.einsum("nk,nkc->nc", weights.astype(np.float32), frames)
+    return out
+
+
+def set_channels(data, channels):
+    if data.shape[1] == channels:
+        return data
+    if channels == 1:
+        return data.mean(axis=1, keepdims=True, dtype=np.float32)
+    if data.shape[1] == 1:
+        return np.repeat(data, channels, axis=1)
+    raise ValueError(f"Can't convert {data.shape[1]} channels to {channels}")
+
+
+def to_pcm(buffer, sample_width):
+    if buffer.dtype != np.float32:
+        if buffer.dtype.itemsize == sample_width and (sample_width == 1) == (buffer.dtype == np.uint8):
+            return buffer.tobytes()
+        buffer = to_float(buffer)
+    scale = float(1 << (8 * sample_width - 1))
+    if sample_width == 4:
+        # In float32, 2**31 - 1 rounds up to 2**31 and clipped peaks would wrap
+        buffer = buffer.astype(np.float64)
+    ints = np.clip(np.round(buffer * scale), -scale, scale - 1)
+    if sample_width == 1:
+        # 8-bit WAV is unsigned
+        return (ints + 128).astype(np.uint8).tobytes()
+    return ints.astype(_INT_TYPES[sample_width]).tobytes()
@@ -0,0 +1,113 @@
+# sample_cache.py
+#
+# Process-wide cache of decoded samples shared by live playback and export.
+# Entries are keyed by path and mtime, hold the decoded PCM, and are evicted
+# least-recently-used first once the memory budget is exceeded. Format
+# conversions are also kept on disk by the PCM cache (pcm_cache.py) so later
+# sessions skip them.
+
+import os
+import threading
+from collections import OrderedDict
+from .pcm_cache import pcm_cache
+from .profiling import profiler
+from .sample import decode_sample
+
+DEFAULT_BUDGET = 256 * 1024 * 1024  # bytes
+DEFAULT_MAX_ENTRIES = 256  # each mapped sample keeps a file descriptor open
+
+
+class _Entry:
+    def __init__(self, mtime, sample):
+        self.mtime = mtime
+        self.sample = sample
+
+    @property
+    def nbytes(self):
+        return self.sample.nbytes
+
+
+class SampleCache:
+    def __init__(self, budget=DEFAULT_BUDGET, store=None, max_entries=DEFAULT_MAX_ENTRIES):
+        self.budget = budget
+        self.max_entries = max_entries
+        self.store = store
+        self.hits = 0
+        self.misses = 0
+        self.evicted = 0
+        self._entries = OrderedDict()
+        self._lock = threading.RLock()
+
+    def _entry(self, path):
+        key = os.path.abspath(path)
+        mtime = os.path.getmtime(key)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry.mtime == mtime:
+                self.hits += 1
+                self._entries.move_to_end(key)
+                return entry
+        # Decode outside the lock so one slow file doesn't block other lookups
+        with profiler.timer("sample.decode"):
+            sample = decode_sample(key)
+        sample.store = self.store
+        with self._lock:
+            self.misses += 1
+            entry = _Entry(mtime, sample)
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            self.trim()
+        return entry
+
+    def get_sample(self, path):
+        return self._entry(path).sample
+
+    def prefetch(self, paths):
+        """Decode `paths` on a background thread so first use is a cache hit."""
+        def run():
+            for path in paths:
+                try:
+                    self._entry(path)
+                except Exception as e:
+                    print(f"Couldn't preload {path}: {e}")
+        thread = threading.Thread(target=run, name="sample-prefetch", daemon=True)
+        thread.start()
+        return thread
+
+    @property
+    def nbytes(self):
+        with self._lock:
+            return sum(entry.nbytes for entry in self._entries.values())
+
+    def set_budget(self, budget):
+        self.budget = budget
+        self.trim()
+
+    def trim(self):
+        with self._lock:
+            total = sum(entry.nbytes for entry in self._entries.values())
+            # Always keep the most recently used entry, even if it alone is over budget.
+            # Evicted samples close their mapping once the last user lets go of them.
+            while (total > self.budget or len(self._entries) > self.max_entries) and len(self._entries) > 1:
+                _, entry = self._entries.popitem(last=False)
+                total -= entry.nbytes
+                self.evicted += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evicted": self.evicted,
+                "entries": len(self._entries),
+                "bytes": sum(entry.nbytes for entry in self._entries.values()),
+                "budget": self.budget,
+                "max_entries": self.max_entries,
+            }
+
+
+sample_cache = SampleCache(store=pcm_cache)
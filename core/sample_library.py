@@ -0,0 +1,175 @@
+# sample_library.py
+#
+# Persistent index of the sample library (<root>/<folder>/<file>.wav). The
+# folder and file lists the GUIs show come from memory; a background scan
+# refreshes them and records each file's duration, rate, channels and peak.
+# Files whose mtime and size are unchanged keep their entry, so a rescan of
+# a big library only probes what changed. The index is saved as JSON under
+# the user cache directory, one file per library root, so the sample
+# folders themselves (tracked by git here) are never written to.
+
+import hashlib
+import json
+import os
+import threading
+import time
+import numpy as np
+from .sample import decode_sample, to_float
+from .wavfile import WavFormatError, map_wav
+
+INDEX_DIR = os.path.join(
+    os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache"), "one", "library")
+INDEX_VERSION = 1
+EXTENSIONS = (".wav",)
+SAVE_INTERVAL_S = 10.0  # how often a long scan saves its progress
+
+
+def index_path_for(root):
+    digest = hashlib.sha1(os.path.abspath(root).encode()).hexdigest()[:16]
+    return os.path.join(INDEX_DIR, f"{digest}.json")
+
+
+def probe_sample(path):
+    try:
+        wav = map_wav(path)
+        pcm, frame_rate = wav.pcm, wav.frame_rate
+    except WavFormatError:
+        sample = decode_sample(path)
+        pcm, frame_rate = sample.data, sample.frame_rate
+    peak = 0.0
+    if len(pcm):
+        # min/max on the integer data, so only two values get converted
+        extremes = np.array([[pcm.min()], [pcm.max()]], dtype=pcm.dtype)
+        peak = float(np.abs(to_float(extremes)).max())
+    return {
+        "duration": len(pcm) / float(frame_rate),
+        "frame_rate": frame_rate,
+        "channels": pcm.shape[1],
+        "peak": round(peak, 6),
+    }
+
+
+class SampleLibrary:
+    def __init__(self, root, index_path=None):
+        self.root = root
+        self.index_path = index_path or index_path_for(root)
+        self.version = 0  # bumped whenever the folder/file listing changes
+        self._folders = {}  # folder -> {file name: entry dict}
+        self._sorted = {}
+        self._sorted_folders = None
+        self._lock = threading.Lock()
+        self._thread = None
+
+    @property
+    def scanning(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def folders(self):
+        with self._lock:
+            if self._sorted_folders is None:
+                self._sorted_folders = sorted(self._folders)
+            return list(self._sorted_folders)
+
+    def files(self, folder):
+        with self._lock:
+            names = self._sorted.get(folder)
+            if names is None:
+                names = self._sorted[folder] = sorted(self._folders.get(folder, ()))
+            return list(names)
+
+    def info(self, folder, name):
+        """Metadata for one file, or None if it isn't indexed or probed yet."""
+        with self._lock:
+            entry = self._folders.get(folder, {}).get(name)
+            if entry is None or "duration" not in entry:
+                return None
+            return dict(entry)
+
+    def load(self):
+        """Read the saved index; returns False if there was none to read."""
+        try:
+            with open(self.index_path) as f:
+                index = json.load(f)
+        except (OSError, ValueError):
+            return False
+        if index.get("version") != INDEX_VERSION:
+            return False
+        self._publish(index.get("folders", {}))
+        return True
+
+    def save(self):
+        with self._lock:
+            data = json.dumps({"version": INDEX_VERSION, "folders": self._folders}, separators=(",", ":"))
+        try:
+            os.makedirs(os.path.dirname(self.index_path) or ".", exist_ok=True)
+            with open(self.index_path + ".tmp", "w") as f:
+                f.write(data)
+            os.replace(self.index_path + ".tmp", self.index_path)
+        except OSError as e:
+            print(f"Couldn't save sample index: {e}")
+
+    def scan(self, probe=True):
+        """Re-list the library, then probe new or changed files if `probe`."""
+        with self._lock:
+            old = self._folders
+        folders = {}
+        try:
+            folder_entries = list(os.scandir(self.root))
+        except OSError:
+            folder_entries = []
+        for folder in folder_entries:
+            if folder.name.startswith(".") or not folder.is_dir():
+                continue
+            known = old.get(folder.name, {})
+            files = folders[folder.name] = {}
+            try:
+                file_entries = list(os.scandir(folder.path))
+            except OSError:
+                continue
+            for entry in file_entries:
+                if not entry.name.lower().endswith(EXTENSIONS) or not entry.is_file():
+                    continue
+                st = entry.stat()
+                indexed = known.get(entry.name)
+                if indexed and indexed["mtime_ns"] == st.st_mtime_ns and indexed["size"] == st.st_size:
+                    files[entry.name] = indexed
+                else:
+                    files[entry.name] = {"mtime_ns": st.st_mtime_ns, "size": st.st_size}
+        self._publish(folders)
+        if not probe:
+            return
+        probed = 0
+        last_save = time.monotonic()
+        for folder, files in folders.items():
+            for name, entry in files.items():
+                if "duration" in entry or "error" in entry:
+                    continue
+                try:
+                    meta = probe_sample(os.path.join(self.root, folder, name))
+                except Exception as e:
+                    meta = {"error": str(e)}
+                with self._lock:
+                    entry.update(meta)
+                probed += 1
+                if time.monotonic() - last_save > SAVE_INTERVAL_S:
+                    self.save()
+                    last_save = time.monotonic()
+        if probed or folders != old:
+            self.save()
+
+    def scan_async(self, probe=True):
+        if self.scanning:
+            return self._thread
+        self._thread = threading.Thread(target=self.scan, args=(probe,), name="sample-library-scan", daemon=True)
+        self._thread.start()
+        return self._thread
+
+    def _publish(self, folders):
+        with self._lock:
+            changed = {f: set(names) for f, names in folders.items()} != \
+                {f: set(names) for f, names in self._folders.items()}
+            self._folders = folders
+            self._sorted = {}
+            self._sorted_folders = None
+            if changed:
+                self.version += 1
@@ -0,0 +1,85 @@
+# scheduler.py
+#
+# Lookahead step scheduler. Step k starts at frame round(k * step_frames),
+# computed from an absolute sample clock instead of chaining millisecond
+# timers, so the tempo can't drift. A dedicated thread keeps the sink
+# rendered `lookahead_ms` ahead of the audio clock, and the UI reads the
+# playhead back from that clock.
+
+import threading
+import time
+from .mixer import step_ms
+from .profiling import profiler
+
+LOOKAHEAD_MS = 100
+
+
+class Scheduler:
+    def __init__(self, sink, bpm, steps, events_fn, lookahead_ms=LOOKAHEAD_MS):
+        # events_fn(col) -> list of (data, track) to start on that column.
+        # It runs on the scheduler thread, so it must not touch Tk.
+        self.sink = sink
+        self.steps = steps
+        self.events_fn = events_fn
+        self.step_frames = sink.frame_rate * step_ms(bpm) / 1000.0
+        self.lookahead_frames = int(sink.frame_rate * lookahead_ms / 1000.0)
+        self.next_step = 0
+        self._running = False
+        self._thread = None
+
+    def step_frame(self, k):
+        return int(round(k * self.step_frames))
+
+    def current_column(self):
+        """Column under the audio clock, i.e. the one being heard right now."""
+        return int(self.sink.clock() / self.step_frames) % self.steps
+
+    def advance(self, until_frame):
+        """Schedule every step starting before `until_frame` and render up to it."""
+        # Round up to the sink's block size so no step lands in a block that
+        # has already been rendered
+        block = self.sink.block_frames
+        until_frame = -(-until_frame // block) * block
+        while self.step_frame(self.next_step) < until_frame:
+            frame = self.step_frame(self.next_step)
+            if profiler.enabled:
+                profiler.record("tick.lead_ms", (frame - self.sink.clock()) * 1000.0 / self.sink.frame_rate)
+            with profiler.timer("tick.events"):
+                for data, track in self.events_fn(self.next_step % self.steps):
+                    self.sink.schedule(frame, data, track)
+            self.sink.end_tick(self.next_step)
+            self.next_step += 1
+        with profiler.timer("tick.mix"):
+            self.sink.render_until(until_frame)
+
+    def run_offline(self, frames):
+        """Render `frames` frames without a thread (file/null sinks)."""
+        self.sink.open()
+        try:
+            self.advance(frames)
+        finally:
+            self.sink.close()
+
+    def start(self):
+        if self._running:
+            return
+        self._running = True
+        self.sink.open()
+        self._thread = threading.Thread(target=self._run, name="step-scheduler", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        if not self._running:
+            return
+        self._running = False
+        if self._thread:
+            self._thread.join()
+            self._thread = None
+        self.sink.close()
+
+    def _run(self):
+        block_s = self.sink.block_frames / float(self.sink.frame_rate)
+        while self._running:
+            self.advance(self.sink.clock() + self.lookahead_frames)
+            if self.sink.realtime:
+                time.sleep(block_s / 4)
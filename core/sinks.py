@@ -0,0 +1,256 @@
+# sinks.py
+#
+# Audio sinks for the lookahead scheduler. The scheduler hands every sink
+# pre-timed voices (start frame + float32 data); the sink mixes them into
+# fixed-size blocks and sends the blocks wherever it sends audio.
+
+import time
+import wave
+from collections import deque
+import numpy as np
+from .audio import ensure_mixer
+from .sample import to_float, to_pcm
+
+BLOCK_FRAMES = 1024
+STEAL_POLICIES = ("oldest", "quietest", None)  # None drops the new voice instead
+STEAL_FADE_FRAMES = 64  # fade-out applied to a stolen voice, avoids a click
+LOUDNESS_FRAMES = 512  # window the "quietest" policy measures from the steal point
+TICK_HISTORY = 4096
+
+
+class BlockMixer:
+    """Mixes pre-timed voices into blocks, with optional polyphony limits.
+
+    max_voices caps the voices sounding at once and track_voices caps them
+    per track. When a new voice would exceed a cap, the oldest or quietest
+    sounding voice in the way is faded out (steal), or with steal=None the
+    new voice is dropped. Totals are kept in started/stolen/dropped/peak_voices
+    and end_tick() logs (tick, voices, stolen, dropped) per step in `ticks`.
+    """
+
+    def __init__(self, channels, max_voices=None, track_voices=None, steal="oldest"):
+        if steal not in STEAL_POLICIES:
+            raise ValueError(f"steal must be one of {STEAL_POLICIES}")
+        self.channels = channels
+        self.max_voices = max_voices
+        self.track_voices = track_voices
+        self.steal = steal
+        self.voices = []  # [start_frame, data, track, fade_at]
+        self.started = 0
+        self.stolen = 0
+        self.dropped = 0
+        self.peak_voices = 0
+        self.ticks = deque(maxlen=TICK_HISTORY)
+        self._tick_stolen = 0
+        self._tick_dropped = 0
+        self._tick_voices = 0
+
+    def add(self, frame, data, track=None):
+        sounding = [v for v in self.voices if v[0] <= frame < v[0] + len(v[1]) and v[3] is None]
+        self._tick_voices = max(self._tick_voices, len(sounding))
+        if self.track_voices is not None:
+            same_track = [v for v in sounding if v[2] == track]
+            if len(same_track) >= self.track_voices and not self._make_room(frame, same_track, sounding):
+                return False
+        if self.max_voices is not None and len(sounding) >= self.max_voices \
+                and not self._make_room(frame, sounding, sounding):
+            return False
+        self._tick_voices = max(self._tick_voices, len(sounding) + 1)
+        self.peak_voices = max(self.peak_voices, len(sounding) + 1)
+        self.voices.append([frame, data, track, None])
+        self.started += 1
+        return True
+
+    def _make_room(self, frame, candidates, sounding):
+        if self.steal is None or not candidates:
+            self.dropped += 1
+            self._tick_dropped += 1
+            return False
+        if self.steal == "oldest":
+            victim = min(candidates, key=lambda v: v[0])
+        else:
+            victim = min(candidates, key=lambda v: self._loudness(v, frame))
+        # Fade the victim out from `frame` and forget everything after that
+        victim[3] = frame - victim[0]
+        victim[1] = victim[1][:victim[3] + STEAL_FADE_FRAMES]
+        sounding[:] = [v for v in sounding if v is not victim]
+        self.stolen += 1
+        self._tick_stolen += 1
+        return True
+
+    @staticmethod
+    def _loudness(voice, frame):
+        pos = frame - voice[0]
+        window = voice[1][pos:pos + LOUDNESS_FRAMES]
+        return float(np.abs(to_float(window)).max()) if len(window) else 0.0
+
+    def end_tick(self, tick):
+        self.ticks.append((tick, self._tick_voices, self._tick_stolen, self._tick_dropped))
+        self._tick_stolen = self._tick_dropped = self._tick_voices = 0
+
+    def stats(self):
+        return {"started": self.started, "stolen": self.stolen, "dropped": self.dropped,
+                "peak_voices": self.peak_voices}
+
+    def render(self, start, n):
+        out = np.zeros((n, self.channels), dtype=np.float32)
+        end = start + n
+        alive = []
+        for voice in self.voices:
+            frame, data, _, fade_at = voice
+            if frame >= end:
+                alive.append(voice)
+                continue
+            src = start - frame  # offset into the voice's data
+            dst = 0
+            if src < 0:
+                dst, src = -src, 0
+            count = min(len(data) - src, n - dst)
+            if count > 0:
+                chunk = to_float(data[src:src + count])
+                if fade_at is not None and src + count > fade_at:
+                    pos = np.arange(src, src + count)
+                    gain = np.clip(1.0 - (pos - fade_at) / float(STEAL_FADE_FRAMES), 0.0, 1.0)
+                    chunk = chunk * gain[:, None].astype(np.float32)
+                out[dst:dst + count] += chunk
+            if frame + len(data) > end:
+                alive.append(voice)
+        self.voices = alive
+        return out
+
+    def clear(self):
+        self.voices = []
+
+
+class AudioSink:
+    """Base sink: mixes scheduled voices and writes blocks as fast as asked.
+
+    clock() is the audio clock in frames, i.e. what the listener has heard.
+    Non-realtime sinks "hear" a frame as soon as it is written.
+    """
+
+    realtime = False
+
+    def __init__(self, frame_rate=44100, channels=2, block_frames=BLOCK_FRAMES, **voice_limits):
+        # voice_limits: max_voices, track_voices, steal (see BlockMixer)
+        self.frame_rate = frame_rate
+        self.channels = channels
+        self.block_frames = block_frames
+        self.mixer = BlockMixer(channels, **voice_limits)
+        self.written = 0
+
+    def open(self):
+        pass
+
+    def close(self):
+        pass
+
+    def schedule(self, frame, data, track=None):
+        self.mixer.add(frame, data, track)
+
+    def end_tick(self, tick):
+        self.mixer.end_tick(tick)
+
+    def render_until(self, frame):
+        while self.written < frame:
+            n = min(self.block_frames, frame - self.written)
+            self.write(self.mixer.render(self.written, n))
+            self.written += n
+
+    def write(self, block):
+        pass
+
+    def clock(self):
+        return self.written
+
+
+class NullSink(AudioSink):
+    """Discards audio but records every scheduled event as (frame, track).
+
+    With realtime=True the clock follows the wall clock like a sound card
+    would, otherwise the scheduler can run as fast as it likes.
+    """
+
+    def __init__(self, frame_rate=44100, channels=2, block_frames=BLOCK_FRAMES, realtime=False):
+        super().__init__(frame_rate, channels, block_frames)
+        self.realtime = realtime
+        self.events = []
+        self._t0 = None
+
+    def open(self):
+        self._t0 = time.perf_counter()
+
+    def schedule(self, frame, data, track=None):
+        self.events.append((frame, track))
+
+    def clock(self):
+        if self.realtime and self._t0 is not None:
+            return int((time.perf_counter() - self._t0) * self.frame_rate)
+        return self.written
+
+
+class WavSink(AudioSink):
+    def __init__(self, path, frame_rate=44100, channels=2, block_frames=BLOCK_FRAMES, sample_width=2):
+        super().__init__(frame_rate, channels, block_frames)
+        self.path = path
+        self.sample_width = sample_width
+        self._wav = None
+
+    def open(self):
+        self._wav = wave.open(self.path, "wb")
+        self._wav.setnchannels(self.channels)
+        self._wav.setsampwidth(self.sample_width)
+        self._wav.setframerate(self.frame_rate)
+
+    def write(self, block):
+        self._wav.writeframes(to_pcm(block, self.sample_width))
+
+    def close(self):
+        if self._wav:
+            self._wav.close()
+            self._wav = None
+
+
+class PygameSink(AudioSink):
+    """Streams blocks through one reserved pygame.mixer channel."""
+
+    realtime = True
+
+    def __init__(self, block_frames=BLOCK_FRAMES, **voice_limits):
+        import pygame
+        frequency, size, channels = ensure_mixer()
+        super().__init__(frequency, channels, block_frames, **voice_limits)
+        self.sample_width = abs(size) // 8
+        self._pygame = pygame
+        self._channel = None
+        self._t0 = None
+
+    def open(self):
+        self._pygame.mixer.set_reserved(1)
+        self._channel = self._pygame.mixer.Channel(0)
+        self._t0 = None
+
+    def write(self, block):
+        sound = self._pygame.mixer.Sound(buffer=to_pcm(block, self.sample_width))
+        if self._t0 is None:
+            self._channel.play(sound)
+            self._t0 = time.perf_counter()
+            return
+        # The channel holds the playing block plus one queued block
+        while self._channel.get_queue() is not None:
+            time.sleep(0.002)
+        if self._channel.get_busy():
+            self._channel.queue(sound)
+        else:
+            self._channel.play(sound)
+
+    def clock(self):
+        if self._t0 is None:
+            return 0
+        return min(self.written, int((time.perf_counter() - self._t0) * self.frame_rate))
+
+    def close(self):
+        if self._channel:
+            self._channel.stop()
+            self._channel = None
+
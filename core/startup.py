@@ -0,0 +1,44 @@
+# startup.py
+#
+# Start-up timing for the front ends. Import this module before anything
+# heavy; its clock starts then, so the numbers cover imports, building the
+# app and drawing the first frame, but not the interpreter's own start-up.
+#
+#   python try3/main.py --startup-time     # print the timings and quit
+#   ONE_STARTUP=1 python main/gui1.py      # print them and keep running
+
+import os
+import sys
+import time
+
+STARTED = time.perf_counter()
+marks = []  # (name, seconds since STARTED)
+
+
+def enabled():
+    return "--startup-time" in sys.argv or bool(os.environ.get("ONE_STARTUP"))
+
+
+def mark(name):
+    marks.append((name, time.perf_counter() - STARTED))
+
+
+def report():
+    lines = ["startup (ms since first import)"]
+    last = 0.0
+    for name, t in marks:
+        lines.append(f"  {name:<14}{t * 1000:>9.1f}{(t - last) * 1000:>+9.1f}")
+        last = t
+    return "\n".join(lines)
+
+
+def report_first_frame(root):
+    """Print the timings once `root` is on screen; quits under --startup-time."""
+    def first_frame():
+        root.wait_visibility()
+        root.update_idletasks()
+        mark("first frame")
+        print(report())
+        if "--startup-time" in sys.argv:
+            root.destroy()
+    root.after_idle(first_frame)
@@ -0,0 +1,347 @@
+# stems.py
+#
+# Parallel export: every track is rendered in its own worker process, the
+# parent sums the per-track renders into the mix and can also keep each track
+# as a stem WAV. The output matches the streaming export in core/mixer.py.
+# With a TrackRenderCache, tracks that haven't changed since the last export
+# are summed from their cached renders instead of being rendered again.
+# export_sections does the same for a song: each distinct pattern is rendered
+# once and its buffer laid down wherever the arrangement plays it.
+
+import hashlib
+import os
+import threading
+import wave
+from collections import OrderedDict, deque
+from itertools import islice
+import numpy as np
+from .mixer import loop_frames, mix_into, output_format, step_offsets, track_voice
+from .pattern import active_steps
+from .profiling import profiler
+from .sample import to_pcm
+from .sample_cache import sample_cache
+
+RENDER_CACHE_BUDGET = 256 * 1024 * 1024  # bytes
+PARALLEL_MIN_RENDERS = 8  # fewer uncached tracks than this render in-process
+IN_FLIGHT_PER_WORKER = 2  # renders submitted ahead of the one being summed
+
+
+class SampleFormat:
+    def __init__(self, frame_rate, channels, sample_width):
+        self.frame_rate = frame_rate
+        self.channels = channels
+        self.sample_width = sample_width
+
+
+def probe_format(path):
+    """Format of a sample file, from the WAV header when possible."""
+    try:
+        with wave.open(path, "rb") as wav:
+            # pydub widens 24-bit samples to 32-bit on load
+            width = 4 if wav.getsampwidth() == 3 else wav.getsampwidth()
+            return SampleFormat(wav.getframerate(), wav.getnchannels(), width)
+    except (wave.Error, EOFError):
+        sample = sample_cache.get_sample(path)
+        return SampleFormat(sample.frame_rate, sample.channels, sample.sample_width)
+
+
+def render_track(path, grid, bpm, steps, frame_rate, channels, sample_width, cut_ms=None):
+    """Worker: render one track.
+
+    Returns the track's hits rendered with their full tails, padded to a
+    whole number of loops (see write_bars).
+    """
+    data = track_voice(sample_cache.get_sample(path), cut_ms, frame_rate, channels)
+    length = loop_frames(bpm, steps, frame_rate)
+    loops = -(-(length + len(data)) // length)
+    out = np.zeros((loops * length, channels), dtype=np.float32)
+    offsets = step_offsets(grid, bpm, steps, frame_rate)
+    if offsets:
+        mix_into(out, data, offsets)
+    return out
+
+
+def write_bars(path, rendered, length, bars, frame_rate, sample_width):
+    """Write `bars` loops of a track rendered with its tails.
+
+    rendered holds one loop's hits plus the tails that run past its end, cut
+    into loop-sized segments. Bar k hears segments 0..k, which is what the
+    streaming export produces when tails carry on into the following bars.
+    """
+    segments = rendered.reshape(-1, length, rendered.shape[1])
+    bar = segments[0].copy()
+    with wave.open(path, "wb") as wav:
+        wav.setnchannels(rendered.shape[1])
+        wav.setsampwidth(sample_width)
+        wav.setframerate(frame_rate)
+        for k in range(bars):
+            if 0 < k < len(segments):
+                bar += segments[k]
+            wav.writeframes(to_pcm(bar, sample_width))
+
+
+class TrackRenderCache:
+    """Rendered tracks (see render_track), least recently used evicted first.
+
+    The key covers everything a render depends on: the sample file and its
+    mtime/size, the active steps, the note cut, tempo, loop length and output
+    format. Muted tracks never reach the export, so they have no entry.
+    """
+
+    def __init__(self, budget=RENDER_CACHE_BUDGET):
+        self.budget = budget
+        self.hits = 0
+        self.misses = 0
+        self._renders = OrderedDict()
+        self._nbytes = 0
+        self._lock = threading.Lock()
+
+    def key(self, track, bpm, steps, frame_rate, channels):
+        path, grid = track[0], track[1]
+        cut_ms = track[2] if len(track) > 2 else None
+        try:
+            st = os.stat(path)
+        except OSError:
+            return None
+        h = hashlib.sha1(repr((os.path.abspath(path), st.st_mtime_ns, st.st_size,
+                               bpm, steps, cut_ms, frame_rate, channels)).encode())
+        h.update(active_steps(grid, steps).tobytes())
+        return h.hexdigest()
+
+    def get(self, key):
+        with self._lock:
+            rendered = self._renders.get(key) if key else None
+            if rendered is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._renders.move_to_end(key)
+            return rendered
+
+    def put(self, key, rendered):
+        if not key or rendered.nbytes > self.budget:
+            return
+        rendered.flags.writeable = False  # shared by every later export
+        with self._lock:
+            old = self._renders.pop(key, None)
+            if old is not None:
+                self._nbytes -= old.nbytes
+            self._renders[key] = rendered
+            self._nbytes += rendered.nbytes
+            while self._nbytes > self.budget:
+                _, evicted = self._renders.popitem(last=False)
+                self._nbytes -= evicted.nbytes
+
+    def clear(self):
+        with self._lock:
+            self._renders.clear()
+            self._nbytes = 0
+
+
+track_renders = TrackRenderCache()
+
+
+def stem_path_for(output_path, index, name):
+    base = os.path.splitext(output_path)[0]
+    return f"{base}_stem{index:02d}_{name}.wav"
+
+
+def pool_context():
+    """Start method for render pools: never a plain fork of the caller.
+
+    The GUIs export while scheduler, library-scan and prefetch threads may
+    hold the sample cache, profiler or stdio locks, and a forked worker
+    would inherit them held. forkserver forks workers from a clean helper
+    process that has this module preloaded; spawn where there is none.
+    """
+    import multiprocessing
+    if "forkserver" not in multiprocessing.get_all_start_methods():
+        return multiprocessing.get_context("spawn")
+    context = multiprocessing.get_context("forkserver")
+    context.set_forkserver_preload([__name__])
+    return context
+
+
+def render_tracks(jobs, frame_rate, channels, sample_width, workers=None, cache=None):
+    """Render (track, bpm, steps, ...) jobs; yields (job, rendered) in job order.
+
+    With a TrackRenderCache only tracks missing from it are rendered. Those
+    go to a process pool when there are PARALLEL_MIN_RENDERS or more, and are
+    rendered in this process otherwise, which also keeps a GUI export from
+    forking a process full of busy threads for a couple of tracks.
+    Tracks that fail to render are reported and left out.
+    """
+    looked_up = []
+    for job in jobs:
+        track, bpm, steps = job[0], job[1], job[2]
+        key = cached = None
+        if cache is not None:
+            key = cache.key(track, bpm, steps, frame_rate, channels)
+            cached = cache.get(key)
+            print(f"Render cache {'hit' if cached is not None else 'miss'}: {track[0]}")
+        looked_up.append((job, key, cached))
+    misses = sum(1 for _, _, cached in looked_up if cached is None)
+    if cache is not None:
+        print(f"Render cache: {len(looked_up) - misses} cached, {misses} to render")
+
+    from concurrent.futures import ProcessPoolExecutor  # only exports need it; keeps GUI start-up light
+    pool = None
+    if misses >= PARALLEL_MIN_RENDERS:
+        pool = ProcessPoolExecutor(max_workers=workers, mp_context=pool_context())
+
+    def submit(job, key, cached):
+        track, bpm, steps = job[:3]
+        path, grid = track[0], track[1]
+        cut_ms = track[2] if len(track) > 2 else None
+        args = (path, grid, bpm, steps, frame_rate, channels, sample_width, cut_ms)
+        if cached is not None:
+            return job, key, cached, None
+        if pool is not None:
+            return job, key, None, pool.submit(render_track, *args)
+        return job, key, None, args
+
+    # Only a few renders in flight at a time: finished ones wait in memory
+    # until they're summed, which matters once a song has hundreds of tracks
+    queued = iter(looked_up)
+    in_flight = IN_FLIGHT_PER_WORKER * (workers or os.cpu_count() or 1)
+    try:
+        pending = deque(submit(*item) for item in islice(queued, in_flight))
+        while pending:
+            job, key, rendered, work = pending.popleft()
+            pending.extend(submit(*item) for item in islice(queued, 1))
+            if rendered is None:
+                try:
+                    rendered = work.result() if pool is not None else render_track(*work)
+                except Exception as e:
+                    print(f"Error rendering {job[0][0]}: {e}")
+                    continue
+                if cache is not None:
+                    cache.put(key, rendered)
+            yield job, rendered
+    finally:
+        if pool is not None:
+            pool.shutdown()
+
+
+def probe_formats(tracks):
+    """(index, SampleFormat) for every track whose sample can be read."""
+    formats = []
+    with profiler.timer("export.probe"):
+        for index, track in enumerate(tracks):
+            path = track[0]
+            try:
+                formats.append((index, probe_format(path)))
+            except Exception as e:
+                print(f"Error loading {path}: {e}")
+    return formats
+
+
+def add_into(mix, rendered):
+    """Add a track render into the start of `mix`, growing it for longer tails; returns the mix."""
+    if len(rendered) > len(mix):
+        mix = np.concatenate([mix, np.zeros((len(rendered) - len(mix), mix.shape[1]), dtype=np.float32)])
+    mix[:len(rendered)] += rendered
+    return mix
+
+
+def export_parallel(tracks, bpm, bars, output_path, steps, workers=None, stems=False, cache=None, stem_keys=None):
+    """Render tracks across a process pool and write their sum to `output_path`.
+
+    With stems=True the tracks are also written next to the mix as
+    <output>_stemNN_<name>.wav. stem_keys gives each track's (NN, name);
+    neighbouring tracks with the same key share a stem. By default every
+    track is its own stem, numbered in order and named after its sample. With a TrackRenderCache only tracks missing
+    from it are rendered (see render_tracks). Returns the list of stem paths.
+    """
+    formats = probe_formats(tracks)
+    frame_rate, channels, sample_width = output_format([f for _, f in formats])
+
+    out_dir = os.path.dirname(output_path)
+    if out_dir:
+        os.makedirs(out_dir, exist_ok=True)
+    length = loop_frames(bpm, steps, frame_rate)
+    mix = np.zeros((length, channels), dtype=np.float32)
+    if stem_keys is None:
+        stem_keys = {i: (n, os.path.splitext(os.path.basename(tracks[i][0]))[0]) for n, (i, _) in enumerate(formats)}
+    # The stem key rides along as a fourth job field
+    jobs = [(tracks[i], bpm, steps, stem_keys[i]) for i, _ in formats]
+    stem_paths = []
+    stem = stem_mix = None
+
+    def write_stem():
+        if stem_mix is not None:
+            stem_paths.append(stem_path_for(output_path, *stem))
+            write_bars(stem_paths[-1], stem_mix, length, bars, frame_rate, sample_width)
+
+    with profiler.timer("export.render"):
+        for job, rendered in render_tracks(jobs, frame_rate, channels, sample_width, workers, cache):
+            mix = add_into(mix, rendered)
+            if stems:
+                if job[3] != stem:
+                    write_stem()
+                    stem, stem_mix = job[3], np.zeros((length, channels), dtype=np.float32)
+                stem_mix = add_into(stem_mix, rendered)
+        write_stem()
+    with profiler.timer("export.write"):
+        write_bars(output_path, mix, length, bars, frame_rate, sample_width)
+    return stem_paths
+
+
+def pattern_key(tracks, steps):
+    """Identity of a pattern's mix: its samples, cuts and active steps, in order."""
+    h = hashlib.sha1(repr(steps).encode())
+    for track in tracks:
+        h.update(repr((os.path.abspath(track[0]), track[2] if len(track) > 2 else None)).encode())
+        h.update(active_steps(track[1], steps).tobytes())
+    return h.hexdigest()
+
+
+def write_sections(path, placements, frame_rate, channels, sample_width):
+    """Write pattern renders one after another, (rendered, length) in play order.
+
+    Each render starts `length` frames after the previous one; whatever runs
+    past that, tails included, carries on under the patterns that follow,
+    and the last tail is cut at the end of the song like write_bars does.
+    """
+    carry = np.zeros((0, channels), dtype=np.float32)
+    with wave.open(path, "wb") as wav:
+        wav.setnchannels(channels)
+        wav.setsampwidth(sample_width)
+        wav.setframerate(frame_rate)
+        for rendered, length in placements:
+            bar = add_into(np.zeros((length, channels), dtype=np.float32), carry)
+            bar = add_into(bar, rendered)
+            wav.writeframes(to_pcm(bar[:length], sample_width))
+            carry = bar[length:]
+
+
+def export_sections(sections, bpm, output_path, workers=None, cache=None):
+    """Render a song, sections of (tracks, steps, repeats) in play order, to `output_path`.
+
+    Sections whose tracks are identical (see pattern_key) share one render,
+    so a song costs one render per distinct pattern whatever its length;
+    the renders are then laid end to end by write_sections.
+    """
+    keys = [pattern_key(tracks, steps) for tracks, steps, _ in sections]
+    patterns = {}
+    for key, (tracks, steps, _) in zip(keys, sections):
+        patterns.setdefault(key, (tracks, steps))
+    print(f"Song: {len(sections)} sections, {len(patterns)} distinct patterns")
+    probed = {key: probe_formats(tracks) for key, (tracks, _) in patterns.items()}
+    frame_rate, channels, sample_width = output_format([f for formats in probed.values() for _, f in formats])
+
+    out_dir = os.path.dirname(output_path)
+    if out_dir:
+        os.makedirs(out_dir, exist_ok=True)
+    mixes = {key: np.zeros((loop_frames(bpm, steps, frame_rate), channels), dtype=np.float32)
+             for key, (_, steps) in patterns.items()}
+    # The pattern's key rides along as a fourth job field
+    jobs = [(patterns[key][0][i], bpm, patterns[key][1], key) for key, formats in probed.items() for i, _ in formats]
+    with profiler.timer("export.render"):
+        for job, rendered in render_tracks(jobs, frame_rate, channels, sample_width, workers, cache):
+            mixes[job[3]] = add_into(mixes[job[3]], rendered)
+    placements = []
+    for key, (_, steps, repeats) in zip(keys, sections):
+        placements.extend([(mixes[key], loop_frames(bpm, steps, frame_rate))] * repeats)
+    with profiler.timer("export.write"):
+        write_sections(output_path, placements, frame_rate, channels, sample_width)
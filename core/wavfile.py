@@ -0,0 +1,77 @@
+# wavfile.py
+#
+# Memory-mapped reader for plain PCM WAV files. The sample data is exposed as
+# a read-only integer NumPy view straight onto the mapped file, so loading a
+# sample neither parses it through Python bytes nor copies it; pages are read
+# in by the OS as the mixer touches them and can be dropped again under
+# memory pressure. Anything this doesn't handle (compressed audio, float or
+# 24-bit WAVs) raises WavFormatError and is left to pydub.
+
+import mmap
+import struct
+import numpy as np
+
+WAVE_FORMAT_PCM = 0x0001
+WAVE_FORMAT_EXTENSIBLE = 0xFFFE
+
+# 8-bit WAV is unsigned, wider samples are signed little endian
+PCM_DTYPES = {1: np.dtype(np.uint8), 2: np.dtype("<i2"), 4: np.dtype("<i4")}
+
+_CHUNK = struct.Struct("<4sI")
+_FMT = struct.Struct("<HHIIHH")
+
+
+class WavFormatError(ValueError):
+    pass
+
+
+class MappedWav:
+    def __init__(self, pcm, frame_rate, sample_width):
+        self.pcm = pcm  # read-only (frames, channels) view onto the file
+        self.frame_rate = frame_rate
+        self.sample_width = sample_width
+
+    @property
+    def channels(self):
+        return self.pcm.shape[1]
+
+
+def map_wav(path):
+    with open(path, "rb") as f:
+        try:
+            mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:  # empty file
+            raise WavFormatError(f"{path}: empty file")
+    if len(mm) < 12 or mm[0:4] != b"RIFF" or mm[8:12] != b"WAVE":
+        raise WavFormatError(f"{path}: not a RIFF/WAVE file")
+
+    fmt = None
+    pos = 12
+    while pos + _CHUNK.size <= len(mm):
+        chunk_id, size = _CHUNK.unpack_from(mm, pos)
+        body = pos + _CHUNK.size
+        if chunk_id == b"fmt ":
+            if size < _FMT.size:
+                raise WavFormatError(f"{path}: short fmt chunk")
+            fmt = _FMT.unpack_from(mm, body)
+            if fmt[0] == WAVE_FORMAT_EXTENSIBLE and size >= 26:
+                # The real format tag is the first field of the subformat GUID
+                fmt = (struct.unpack_from("<H", mm, body + 24)[0],) + fmt[1:]
+        elif chunk_id == b"data":
+            if fmt is None:
+                raise WavFormatError(f"{path}: data chunk before fmt chunk")
+            return _pcm_view(path, mm, fmt, body, min(size, len(mm) - body))
+        pos = body + size + (size & 1)  # chunks are word aligned
+    raise WavFormatError(f"{path}: no data chunk")
+
+
+def _pcm_view(path, mm, fmt, offset, size):
+    format_tag, channels, frame_rate, _, block_align, bits = fmt
+    if format_tag != WAVE_FORMAT_PCM:
+        raise WavFormatError(f"{path}: format {format_tag:#06x} is not plain PCM")
+    width = bits // 8
+    if bits % 8 or width not in PCM_DTYPES or channels < 1 or block_align != width * channels:
+        raise WavFormatError(f"{path}: unsupported {bits}-bit/{channels}-channel layout")
+    frames = size // block_align
+    pcm = np.frombuffer(mm, dtype=PCM_DTYPES[width], count=frames * channels, offset=offset)
+    return MappedWav(pcm.reshape(frames, channels), frame_rate, width)
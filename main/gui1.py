@@ -1,8 +1,13 @@
 import tkinter as tk
 from tkinter import ttk
-from pydub import AudioSegment
-import pygame
 import os
+import sys
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from core import startup
+from core.audio import preload_async
+from core.engine import Player, export_project
+from core.model import Project, Track
+from core.sample_library import SampleLibrary
 from piano_roll import PianoRollCanvas
 
 # ==== CONFIG ====
@@ -10,18 +15,22 @@ SOUNDS_DIR = "sounds"
 STEPS = 64
 DEFAULT_BPM = 120
 REPEATS = 4
+PLAYHEAD_POLL_MS = 15
 
-pygame.mixer.init()
+library = SampleLibrary(SOUNDS_DIR)
 
 # ==== STATE ====
 class TrackRow:
-    def __init__(self, parent, index, remove_callback, small_pixel):
+    def __init__(self, parent, index, remove_callback, small_pixel, change_callback=None):
         self.index = index
+        self.track = Track(steps=STEPS)
+        self.on_change = change_callback or (lambda: None)
         self.folder_var = tk.StringVar()
         self.file_var = tk.StringVar()
         self.mute_var = tk.BooleanVar(value=False)
+        self.file_var.trace_add("write", self.on_file_change)
+        self.mute_var.trace_add("write", self.on_mute_change)
         self.buttons = []
-        self.grid = [0] * STEPS
         self.frame = tk.Frame(parent)
         self.frame.grid(row=index, column=0, sticky="w")
 
@@ -50,19 +59,32 @@ class TrackRow:
             btn.grid(row=0, column=col, padx=0, pady=0, ipadx=0, ipady=0)
             self.buttons.append(btn)
 
+    @property
+    def grid(self):
+        return self.track.grid
+
     def get_folders(self):
-        return [f for f in os.listdir(SOUNDS_DIR) if os.path.isdir(os.path.join(SOUNDS_DIR, f))]
+        return library.folders()
 
     def update_file_list(self, *args):
-        folder = self.folder_var.get()
-        files = [f for f in os.listdir(os.path.join(SOUNDS_DIR, folder)) if f.endswith(".wav")]
+        self.track.folder = self.folder_var.get()
+        files = library.files(self.folder_var.get())
         self.file_dropdown["values"] = files
         if files:
             self.file_var.set(files[0])
 
+    def on_file_change(self, *args):
+        self.track.sample = self.file_var.get()
+        self.on_change()
+
+    def on_mute_change(self, *args):
+        self.track.mute = self.mute_var.get()
+        self.on_change()
+
     def toggle_step(self, col):
         self.grid[col] = 1 - self.grid[col]
         self.update_button_color(col)
+        self.on_change()
 
     def update_button_color(self, col, highlight=False):
         is_muted = self.mute_var.get()
@@ -101,6 +123,8 @@ class SequencerApp:
         self.track_rows = []
         self.playback_after_id = None
         self.is_playing = False
+        self.project = Project(DEFAULT_BPM, STEPS)
+        self.player = Player(SOUNDS_DIR)
 
         self.small_pixel = tk.PhotoImage(width=20, height=40)
 
@@ -128,6 +152,11 @@ class SequencerApp:
         self.piano_roll = PianoRollCanvas(self.piano_roll_frame, steps=STEPS)
         self.piano_roll.pack()
 
+        if not library.load():
+            library.scan(probe=False)
+        library.scan_async()
+        self.root.after_idle(preload_async)
+
         self.add_row()
 
     def toggle_playback(self):
@@ -148,68 +177,62 @@ class SequencerApp:
 
     def add_row(self):
         index = len(self.track_rows)
-        row = TrackRow(self.track_frame, index, self.remove_row, self.small_pixel)
+        row = TrackRow(self.track_frame, index, self.remove_row, self.small_pixel, self.project_changed)
+        self.project.add_track(row.track)
         self.track_rows.append(row)
+        self.project_changed()
 
     def remove_row(self, row):
         if row in self.track_rows:
             row.destroy()
             self.track_rows.remove(row)
+            self.project.remove_track(row.track)
             self.refresh_rows()
+            self.project_changed()
 
     def refresh_rows(self):
         for i, row in enumerate(self.track_rows):
             row.index = i
             row.frame.grid(row=i, column=0)
 
-    def play_sequence(self):
+    def project_changed(self):
         if self.is_playing:
-            return
+            self.player.update(self.project.snapshot())
 
+    def read_bpm(self):
         try:
             bpm = int(self.bpm_entry.get())
             if bpm <= 0:
                 raise ValueError
         except ValueError:
             print("Invalid BPM")
-            return
-
-        beat_duration_ms = int(60000 / bpm / 2)
-        self.sounds = []
-
-        for row in self.track_rows:
-            path = os.path.join(SOUNDS_DIR, row.folder_var.get(), row.file_var.get())
-            try:
-                self.sounds.append(pygame.mixer.Sound(path))
-            except:
-                self.sounds.append(None)
+            return False
+        self.project.bpm = bpm
+        return True
 
+    def play_sequence(self):
+        if self.is_playing or not self.read_bpm():
+            return
+        self.player.start(self.project.snapshot())
         self.is_playing = True
+        self.last_play_col = None
+        self.follow_playhead()
 
-        def step(col=0):
-            if not self.is_playing:
-                for row in self.track_rows:
-                    row.highlight_column((col - 1) % STEPS, highlight=False)
-                return
-
-            for row_index in range(min(len(self.track_rows), len(self.sounds))):
-                row = self.track_rows[row_index]
-                row.highlight_column((col - 1) % STEPS, highlight=False)
+    def follow_playhead(self):
+        # Highlight whatever column the audio clock is on
+        col = self.player.current_column()
+        if col != self.last_play_col:
+            for row in self.track_rows:
+                if self.last_play_col is not None:
+                    row.highlight_column(self.last_play_col, highlight=False)
                 row.highlight_column(col, highlight=True)
-
-                if row.grid[col] and not row.mute_var.get():
-                    sound = self.sounds[row_index]
-                    if sound:
-                        sound.play()
-
-            next_col = (col + 1) % STEPS
-            self.playback_after_id = self.root.after(beat_duration_ms, lambda: step(next_col))
-
-        step()
+            self.last_play_col = col
+        self.playback_after_id = self.root.after(PLAYHEAD_POLL_MS, self.follow_playhead)
 
     def stop_playback(self):
         if self.is_playing:
             self.is_playing = False
+            self.player.stop()
             if self.playback_after_id:
                 self.root.after_cancel(self.playback_after_id)
             for row in self.track_rows:
@@ -246,40 +269,19 @@ class SequencerApp:
         tk.Button(dialog, text="Export", command=do_export, bg="lightblue").grid(row=2, column=0, columnspan=2, pady=5)
 
     def export_sequence(self, filename="nba.wav", bars=REPEATS):
-        try:
-            bpm = int(self.bpm_entry.get())
-            if bpm <= 0:
-                raise ValueError
-        except ValueError:
-            print("Invalid BPM")
+        if not self.read_bpm():
             return
-
-        beat_duration_ms = 60000 / bpm / 2
-        total_duration = int(beat_duration_ms * STEPS)
-        loop = AudioSegment.silent(duration=total_duration)
-
-        for row in self.track_rows:
-            if row.mute_var.get():
-                continue
-            path = os.path.join(SOUNDS_DIR, row.folder_var.get(), row.file_var.get())
-            try:
-                sound = AudioSegment.from_file(path)
-            except:
-                continue
-            for col in range(STEPS):
-                if row.grid[col]:
-                    pos = int(col * beat_duration_ms)
-                    loop = loop.overlay(sound, position=pos)
-
-        loop = loop * bars
-        os.makedirs("zoutputs", exist_ok=True)
         output_path = os.path.join("zoutputs", filename)
-        loop.export(output_path, format="wav")
+        export_project(self.project.snapshot(), output_path, bars, SOUNDS_DIR)
         print(f"Exported to {output_path}")
 
 # ==== RUN ====
 if __name__ == "__main__":
+    startup.mark("imports")
     root = tk.Tk()
     root.geometry("2400x1200")
     app = SequencerApp(root)
+    startup.mark("app")
+    if startup.enabled():
+        startup.report_first_frame(root)
     root.mainloop()
\ No newline at end of file
@@ -1,10 +1,11 @@
 import tkinter as tk
+from core.pattern import Pattern
 from .settings import TRACKS, STEPS, DEFAULT_BPM
 from .playback import play_sequence
 
 def run_gui():
     # ==== GUI STATE ====
-    grid = [[0 for _ in range(STEPS)] for _ in range(len(TRACKS))]
+    grid = [Pattern(STEPS) for _ in range(len(TRACKS))]
     buttons = [[None for _ in range(STEPS)] for _ in range(len(TRACKS))]
     selected_samples = [tk.StringVar() for _ in range(len(TRACKS))]
 
@@ -1,8 +1,14 @@
 # main.py
+import os
+import sys
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from core import startup
 import tkinter as tk
 from sequencer import SequencerApp
 from draggable_panel import DraggablePanel
 
+startup.mark("imports")
+
 def main():
     root = tk.Tk()
     root.title("Custom DAW Workspace")
@@ -15,6 +21,9 @@ def main():
         min_width=900, min_height=120,
     )
     seq_app = SequencerApp(root, seq_panel.body, cell_width=20, cell_height=20)
+    startup.mark("app")
+    if startup.enabled():
+        startup.report_first_frame(root)
     root.mainloop()
 
 if __name__ == "__main__":
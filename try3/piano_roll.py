@@ -1,6 +1,23 @@
 import tkinter as tk
+import os
+import sys
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from core.model import Note
+from core.note_index import NoteIntervalIndex
+
+VIEW_STEPS = 64  # columns the canvas asks room for; longer patterns scroll
+MIN_CELL_WIDTH = 4
+MAX_CELL_WIDTH = 64
+ZOOM_STEP = 1.25
+WHEEL_COLS = 4
 
 class PianoRollCanvas(tk.Canvas):
+    # <MouseWheel> goes to the focus widget on some platforms, so it is caught
+    # with bind_all. One handler is bound for the whole app and forwards to
+    # the live canvases; each canvas leaves the list when destroyed.
+    _wheel_canvases = []
+    _wheel_bound = False
+
     def __init__(self, master, steps=64, cell_width=24, cell_height=24, sidebar_width=96, beat_offset=0):
         self.steps = steps
         self.notes_total = 88  # A0 (MIDI 21) to C8 (MIDI 108)
@@ -10,12 +27,17 @@ class PianoRollCanvas(tk.Canvas):
         self.beat_offset = beat_offset
 
         self.top_note = 0  # 0 = C8, 87 = A0
+        self.left_col = 0  # first step in view
+        self.follow_playhead = True  # page the view along with the playhead
+        self.xscrollcommand = None  # e.g. a horizontal Scrollbar's set()
 
-        total_width = self.sidebar_width + steps * cell_width
+        total_width = self.sidebar_width + min(steps, VIEW_STEPS) * cell_width
         total_height = 24 * cell_height
         super().__init__(master, width=total_width, height=total_height, bg="#18191b", highlightthickness=0)
 
+        self.note_lookup = NoteIntervalIndex()  # per-pitch sorted notes behind hit-testing
         self.notes_list = []
+        self.on_change = None  # called after every finished edit to notes_list
         self.drag_start = None
         self.drag_note = None
         self.drag_edge = None
@@ -24,11 +46,27 @@ class PianoRollCanvas(tk.Canvas):
         self.playhead_col = None  # New
         self._has_focus = False
 
+        # Retained canvas items, all sized to the viewport rather than the
+        # pattern: the grid is built once per visible rows x columns x zoom and
+        # recoloured as it scrolls, notes in view get one rectangle each, and
+        # the playhead is a single line.
+        self._built = None  # (rows, cols, cell_width) the static items were built for
+        self._built_rows = 0
+        self._built_cols = 0
+        self._col_items = []  # background rect per visible column slot
+        self._row_items = []  # (key rect, label) per visible row
+        self._note_items = {}  # id(note) -> (item, note), notes in view only
+        self._playhead_item = None
+
         self.bind("<Enter>", self._on_mouse_enter)
         self.bind("<Leave>", self._on_mouse_leave)
         self.bind("<Button-4>", self._on_linux_scroll)
         self.bind("<Button-5>", self._on_linux_scroll)
-        self.bind_all("<MouseWheel>", self._on_mousewheel)
+        PianoRollCanvas._wheel_canvases.append(self)
+        if not PianoRollCanvas._wheel_bound:
+            self.bind_all("<MouseWheel>", PianoRollCanvas._dispatch_mousewheel, add="+")
+            PianoRollCanvas._wheel_bound = True
+        self.bind("<Destroy>", self._on_destroy, add="+")
 
         self.bind("<Button-1>", self.handle_left_click)
         self.bind("<B1-Motion>", self.handle_drag_motion)
@@ -38,12 +76,36 @@ class PianoRollCanvas(tk.Canvas):
 
         self.draw_grid()
 
+    @property
+    def notes_list(self):
+        return self._notes_list
+
+    @notes_list.setter
+    def notes_list(self, notes):
+        self._notes_list = notes
+        self.note_lookup.rebuild(notes)
+
     @property
     def notes_visible(self):
         return max(1, self.winfo_height() // self.cell_height)
 
+    @property
+    def cols_visible(self):
+        # Counting a partly visible last column
+        width = self.winfo_width() - self.sidebar_width
+        return max(1, min(self.steps, -(-width // self.cell_width)))
+
+    def col_x(self, col):
+        return self.sidebar_width + (col - self.left_col) * self.cell_width
+
+    def col_at(self, x):
+        return self.left_col + (x - self.sidebar_width) // self.cell_width
+
     def _on_resize(self, event):
-        self.draw_grid()
+        if (self.notes_visible, self.cols_visible) != (self._built_rows, self._built_cols):
+            self.draw_grid()
+        elif self.playhead_col is not None:
+            self._place_playhead()
 
     def _on_mouse_enter(self, event):
         self._has_focus = True
@@ -51,21 +113,33 @@ class PianoRollCanvas(tk.Canvas):
     def _on_mouse_leave(self, event):
         self._has_focus = False
 
+    @classmethod
+    def _dispatch_mousewheel(cls, event):
+        for canvas in cls._wheel_canvases:
+            canvas._on_mousewheel(event)
+
+    def _on_destroy(self, event):
+        if event.widget is self and self in PianoRollCanvas._wheel_canvases:
+            PianoRollCanvas._wheel_canvases.remove(self)
+
     def _on_mousewheel(self, event):
-        if not self._has_focus:
+        if not self._has_focus or not event.delta:
             return
-        if event.delta > 0:
-            self.scroll_vertical(-3)
-        elif event.delta < 0:
-            self.scroll_vertical(3)
+        self._wheel(event, 1 if event.delta > 0 else -1)
 
     def _on_linux_scroll(self, event):
         if not self._has_focus:
             return
-        if event.num == 4:
-            self.scroll_vertical(-3)
-        elif event.num == 5:
-            self.scroll_vertical(3)
+        self._wheel(event, 1 if event.num == 4 else -1)
+
+    def _wheel(self, event, direction):
+        # Ctrl zooms around the pointer, Shift scrolls through time
+        if event.state & 0x4:
+            self.zoom(ZOOM_STEP if direction > 0 else 1 / ZOOM_STEP, event.x)
+        elif event.state & 0x1:
+            self.scroll_horizontal(-WHEEL_COLS * direction)
+        else:
+            self.scroll_vertical(-3 * direction)
 
     def scroll_vertical(self, delta):
         max_top = max(0, self.notes_total - self.notes_visible)
@@ -76,66 +150,193 @@ class PianoRollCanvas(tk.Canvas):
             new_top = max_top
         if new_top != self.top_note:
             self.top_note = new_top
-            self.draw_grid()
+            self._update_rows()
+            self._sync_notes()
+
+    def scroll_horizontal(self, delta):
+        self.set_left_col(self.left_col + delta)
+
+    def set_left_col(self, col):
+        col = max(0, min(col, self.steps - self._built_cols))
+        if col != self.left_col:
+            self.left_col = col
+            self._update_cols()
+            self._sync_notes()
+            self._place_playhead()
+            self._report_view()
+
+    def on_xscroll(self, *args):
+        """Scrollbar command: ("moveto", fraction) or ("scroll", n, "units"|"pages")."""
+        if args[0] == "moveto":
+            self.set_left_col(round(float(args[1]) * self.steps))
+        elif args[0] == "scroll":
+            page = max(1, self._built_cols - 1) if args[2] == "pages" else 1
+            self.scroll_horizontal(int(args[1]) * page)
+
+    def zoom(self, factor, x=None):
+        """Scale the column width, keeping the step under canvas x (default: left edge) in place."""
+        cell_width = max(MIN_CELL_WIDTH, min(MAX_CELL_WIDTH, round(self.cell_width * factor)))
+        if cell_width == self.cell_width:
+            return
+        offset = max(0, (x if x is not None else self.sidebar_width) - self.sidebar_width)
+        anchor = self.left_col + offset / self.cell_width
+        self.cell_width = cell_width
+        self.left_col = max(0, round(anchor - offset / cell_width))
+        self.draw_grid()
+
+    def _report_view(self):
+        if self.xscrollcommand is not None:
+            self.xscrollcommand(self.left_col / self.steps, min(1.0, (self.left_col + self._built_cols) / self.steps))
 
     def set_playhead(self, col):
         self.playhead_col = col
-        self.draw_grid()
+        if self.follow_playhead and not self.left_col <= col < self.left_col + self._built_cols:
+            self.set_left_col(col)
+        self._place_playhead()
 
     def clear_playhead(self):
         self.playhead_col = None
-        self.draw_grid()
+        self._place_playhead()
 
     def draw_grid(self):
-        self.delete("all")
-        notes_visible = self.notes_visible
+        """Bring every canvas item in line with the current state.
+
+        Items are reused: the static grid is only recreated when the number
+        of visible rows or columns or the zoom changes, notes only when they
+        come into or leave the view.
+        """
+        self._build_static()
+        self.left_col = max(0, min(self.left_col, self.steps - self._built_cols))
+        self._update_cols()
+        self._update_rows()
+        self._sync_notes()
+        self._place_playhead()
+        self._report_view()
+
+    def _column_bg(self, col):
+        block_bg = "#20232b" if (col // 4) % 2 == 0 else "#23262e"
+        if self.highlighted_col == col:
+            block_bg = self.mix_colors(block_bg, "#ffffff", 0.17)
+        return block_bg
+
+    def _build_static(self):
+        notes_visible, cols_visible = self.notes_visible, self.cols_visible
+        if (notes_visible, cols_visible, self.cell_width) == self._built:
+            return
+        self.delete("static")
+        self._built = (notes_visible, cols_visible, self.cell_width)
+        self._built_rows, self._built_cols = notes_visible, cols_visible
+        height = notes_visible * self.cell_height
+        grid_color = "#111"
+        # One background rectangle per column slot, recoloured by
+        # _update_cols as the view scrolls; the gridlines draw the cells
+        self._col_items = []
+        for slot in range(cols_visible):
+            x1 = self.sidebar_width + slot * self.cell_width
+            x2 = x1 + self.cell_width
+            self._col_items.append(self.create_rectangle(
+                x1, 0, x2, height, outline=grid_color, width=1, tags="static"))
+        self._row_items = []
         for vis_row in range(notes_visible):
-            abs_row = self.top_note + vis_row
-            if abs_row >= self.notes_total:
-                continue
             y1 = vis_row * self.cell_height
             y2 = y1 + self.cell_height
-            fg_piano = "#eb42e2" if self.is_row_playing(abs_row) else "#b6bdc2"
-            bg_piano = "#22272c" if (abs_row % 2 == 0) else "#181a1c"
-            self.create_rectangle(0, y1, self.sidebar_width, y2, fill=bg_piano, outline="#25292c")
-            self.create_text(self.sidebar_width // 2, y1 + self.cell_height // 2, text=self.note_name(abs_row),
-                             fill=fg_piano, font=("Segoe UI", 10, "bold"))
-            for col in range(self.steps):
-                x1 = self.sidebar_width + col * self.cell_width
-                x2 = x1 + self.cell_width
-                block_bg = "#20232b" if (col // 4) % 2 == 0 else "#23262e"
-                if self.highlighted_col == col:
-                    block_bg = self.mix_colors(block_bg, "#ffffff", 0.17)
-                self.create_rectangle(x1, y1, x2, y2, fill=block_bg, outline="#111", width=1)
+            key = self.create_rectangle(0, y1, self.sidebar_width, y2, outline="#25292c", tags="static")
+            label = self.create_text(self.sidebar_width // 2, y1 + self.cell_height // 2,
+                                     font=("Segoe UI", 10, "bold"), tags="static")
+            self._row_items.append((key, label))
         # Gridlines
-        grid_color = "#111"
         for vis_row in range(notes_visible + 1):
             y = vis_row * self.cell_height
-            self.create_line(self.sidebar_width, y, self.sidebar_width + self.steps * self.cell_width, y, fill=grid_color)
-        for col in range(self.steps + 1):
-            x = self.sidebar_width + col * self.cell_width
-            self.create_line(x, 0, x, notes_visible * self.cell_height, fill=grid_color)
-        self.create_line(self.sidebar_width, 0, self.sidebar_width, notes_visible * self.cell_height, fill="#25292c")
-        # Draw notes
-        for note in self.notes_list:
-            note_row = note['row']
-            if self.top_note <= note_row < self.top_note + notes_visible:
-                vis_row = note_row - self.top_note
-                y1 = vis_row * self.cell_height
-                y2 = y1 + self.cell_height
-                x1 = self.sidebar_width + note['start'] * self.cell_width + 1
-                x2 = self.sidebar_width + (note['end'] + 1) * self.cell_width - 1
-                self.create_rectangle(x1, y1 + 2, x2, y2 - 2, fill="#eb42e2", outline="#222", width=2)
+            self.create_line(self.sidebar_width, y, self.sidebar_width + cols_visible * self.cell_width, y,
+                             fill=grid_color, tags="static")
+        for slot in range(cols_visible + 1):
+            x = self.sidebar_width + slot * self.cell_width
+            self.create_line(x, 0, x, height, fill=grid_color, tags="static")
+        self.create_line(self.sidebar_width, 0, self.sidebar_width, height, fill="#25292c", tags="static")
+        self.tag_lower("static")
+
+    def _update_cols(self):
+        for slot, item in enumerate(self._col_items):
+            self.itemconfigure(item, fill=self._column_bg(self.left_col + slot))
+
+    def _update_rows(self):
+        for vis_row, (key, label) in enumerate(self._row_items):
+            abs_row = self.top_note + vis_row
+            if abs_row >= self.notes_total:
+                self.itemconfigure(key, state="hidden")
+                self.itemconfigure(label, state="hidden")
+                continue
+            fg_piano = "#eb42e2" if self.is_row_playing(abs_row) else "#b6bdc2"
+            bg_piano = "#22272c" if (abs_row % 2 == 0) else "#181a1c"
+            self.itemconfigure(key, fill=bg_piano, state="normal")
+            self.itemconfigure(label, text=self.note_name(abs_row), fill=fg_piano, state="normal")
+
+    def _update_row_label(self, abs_row):
+        vis_row = abs_row - self.top_note
+        if 0 <= vis_row < len(self._row_items):
+            fg_piano = "#eb42e2" if self.is_row_playing(abs_row) else "#b6bdc2"
+            self.itemconfigure(self._row_items[vis_row][1], fill=fg_piano)
+
+    def _note_coords(self, note):
+        vis_row = note['row'] - self.top_note
+        y1 = vis_row * self.cell_height
+        y2 = y1 + self.cell_height
+        # Clipped at the keyboard for notes that started before the view
+        x1 = max(self.sidebar_width, self.col_x(note['start'])) + 1
+        x2 = self.col_x(note['end'] + 1) - 1
+        return x1, y1 + 2, x2, y2 - 2
+
+    def _in_view(self, note):
+        return (self.top_note <= note['row'] < self.top_note + self._built_rows
+                and note['end'] >= self.left_col and note['start'] < self.left_col + self._built_cols)
+
+    def _draw_note(self, note):
+        if not self._in_view(note):
+            self._erase_note(note)
+            return
+        entry = self._note_items.get(id(note))
+        if entry is None:
+            item = self.create_rectangle(*self._note_coords(note), fill="#eb42e2", outline="#222", width=2, tags="note")
+            self._note_items[id(note)] = (item, note)
+            if self._playhead_item is not None:
+                self.tag_raise(self._playhead_item)
+        else:
+            self.coords(entry[0], *self._note_coords(note))
+
+    def _erase_note(self, note):
+        entry = self._note_items.pop(id(note), None)
+        if entry is not None:
+            self.delete(entry[0])
+
+    def _sync_notes(self):
+        # Only the notes in view are looked up and drawn, so this costs the
+        # same however long the pattern is
+        last_col = self.left_col + self._built_cols - 1
+        in_view = {}
+        for abs_row in range(self.top_note, min(self.top_note + self._built_rows, self.notes_total)):
+            for note in self.note_lookup.in_range(abs_row, self.left_col, last_col):
+                in_view[id(note)] = note
+        for key in [key for key in self._note_items if key not in in_view]:
+            self.delete(self._note_items.pop(key)[0])
+        for note in in_view.values():
+            self._draw_note(note)
+
+    def _place_playhead(self):
         # Draw playhead (continuous)
-        if self.playhead_col is not None:
-            x = self.sidebar_width + self.playhead_col * self.cell_width
-            self.create_line(x, 0, x, self.winfo_height(), fill="#19ffe6", width=3, tags="playhead")
+        if self.playhead_col is None or not self.left_col <= self.playhead_col < self.left_col + self._built_cols:
+            if self._playhead_item is not None:
+                self.itemconfigure(self._playhead_item, state="hidden")
+            return
+        x = self.col_x(self.playhead_col)
+        if self._playhead_item is None:
+            self._playhead_item = self.create_line(x, 0, x, self.winfo_height(), fill="#19ffe6", width=3, tags="playhead")
+        else:
+            self.coords(self._playhead_item, x, 0, x, self.winfo_height())
+            self.itemconfigure(self._playhead_item, state="normal")
+        self.tag_raise(self._playhead_item)
 
     def is_row_playing(self, abs_row):
-        for note in self.notes_list:
-            if note['row'] == abs_row:
-                return True
-        return False
+        return self.note_lookup.has_row(abs_row)
 
     def note_name(self, abs_row):
         midi_note = 108 - abs_row  # 108 = C8, 21 = A0
@@ -145,30 +346,31 @@ class PianoRollCanvas(tk.Canvas):
         return f"{pitch_classes[pitch_class]}{octave}"
 
     def find_note_at(self, abs_row, col):
-        for note in self.notes_list:
-            if note['row'] == abs_row and note['start'] <= col <= note['end']:
-                return note
-        return None
+        return self.note_lookup.find(abs_row, col)
 
     def has_overlap(self, abs_row, start, end, exclude_note=None):
-        for note in self.notes_list:
-            if note is exclude_note:
-                continue
-            if note['row'] == abs_row and not (end < note['start'] or start > note['end']):
-                return True
-        return False
+        return self.note_lookup.overlaps(abs_row, start, end, exclude=exclude_note)
 
-    def handle_left_click(self, event):
-        col = (event.x - self.sidebar_width) // self.cell_width
+    def _cell_at(self, event):
+        """(abs_row, col) under the pointer, or None outside the note grid."""
+        col = self.col_at(event.x)
         vis_row = event.y // self.cell_height
         abs_row = self.top_note + vis_row
-        if 0 <= vis_row < self.notes_visible and 0 <= col < self.steps and 0 <= abs_row < self.notes_total:
+        if event.x >= self.sidebar_width and 0 <= vis_row < self.notes_visible and col < self.steps \
+                and abs_row < self.notes_total:
+            return abs_row, col
+        return None
+
+    def handle_left_click(self, event):
+        cell = self._cell_at(event)
+        if cell is not None:
+            abs_row, col = cell
             existing_note = self.find_note_at(abs_row, col)
             if existing_note:
                 self.drag_note = existing_note
                 self.drag_start = (abs_row, col)
-                x1 = self.sidebar_width + self.drag_note['start'] * self.cell_width
-                x2 = self.sidebar_width + (self.drag_note['end'] + 1) * self.cell_width
+                x1 = self.col_x(self.drag_note['start'])
+                x2 = self.col_x(self.drag_note['end'] + 1)
                 click_x = event.x
                 if abs(click_x - x1) < 6:
                     self.drag_edge = "start"
@@ -179,47 +381,67 @@ class PianoRollCanvas(tk.Canvas):
                     self.drag_edge = "end" if click_x > mid else "start"
             else:
                 if not self.has_overlap(abs_row, col, col):
-                    new_note = {'row': abs_row, 'start': col, 'end': col}
+                    new_note = Note(abs_row, col, col)
                     self.notes_list.append(new_note)
+                    self.note_lookup.add(new_note)
                     self.drag_note = new_note
                     self.drag_start = (abs_row, col)
                     self.drag_edge = "end"
-            self.draw_grid()
+                    self._draw_note(new_note)
+                    self._update_row_label(abs_row)
 
     def handle_drag_motion(self, event):
         if self.drag_note and self.drag_start and self.drag_edge:
             abs_row, original_col = self.drag_start
-            col_now = (event.x - self.sidebar_width) // self.cell_width
-            col_now = max(0, min(col_now, self.steps - 1))
+            # Dragging against either edge scrolls the view along
+            if event.x >= self.winfo_width() - self.cell_width // 2:
+                self.scroll_horizontal(1)
+            elif event.x < self.sidebar_width + self.cell_width // 2:
+                self.scroll_horizontal(-1)
+            col_now = max(0, min(self.col_at(event.x), self.steps - 1))
             if self.drag_edge == "start":
                 new_start = min(col_now, self.drag_note['end'])
                 if not self.has_overlap(abs_row, new_start, self.drag_note['end'], exclude_note=self.drag_note):
+                    old_start = self.drag_note['start']
                     self.drag_note['start'] = new_start
+                    self.note_lookup.move(self.drag_note, old_start)
             elif self.drag_edge == "end":
                 new_end = max(col_now, self.drag_note['start'])
                 if not self.has_overlap(abs_row, self.drag_note['start'], new_end, exclude_note=self.drag_note):
                     self.drag_note['end'] = new_end
-            self.draw_grid()
+            self._draw_note(self.drag_note)
 
     def handle_drag_release(self, event):
+        # A new note is only reported once its length is settled
+        if self.drag_note is not None and self.on_change is not None:
+            self.on_change()
         self.drag_start = None
         self.drag_note = None
         self.drag_edge = None
 
     def handle_right_click(self, event):
-        col = (event.x - self.sidebar_width) // self.cell_width
-        vis_row = event.y // self.cell_height
-        abs_row = self.top_note + vis_row
-        if 0 <= vis_row < self.notes_visible and 0 <= col < self.steps and 0 <= abs_row < self.notes_total:
-            self.notes_list = [note for note in self.notes_list if not (note['row'] == abs_row and note['start'] <= col <= note['end'])]
-            self.draw_grid()
+        cell = self._cell_at(event)
+        if cell is not None:
+            abs_row, col = cell
+            note = self.find_note_at(abs_row, col)
+            if note is None:
+                return
+            self.notes_list.remove(note)
+            self.note_lookup.remove(note)
+            self._erase_note(note)
+            self._update_row_label(abs_row)
+            if self.on_change is not None:
+                self.on_change()
 
     def highlight_column(self, col, highlight=True):
+        previous = self.highlighted_col
         if highlight:
             self.highlighted_col = col
         else:
             self.highlighted_col = None
-        self.draw_grid()
+        for c in (previous, self.highlighted_col):
+            if c is not None and 0 <= c - self.left_col < len(self._col_items):
+                self.itemconfigure(self._col_items[c - self.left_col], fill=self._column_bg(c))
 
     @staticmethod
     def mix_colors(color1, color2, alpha):